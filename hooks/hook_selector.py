@@ -8,6 +8,10 @@ import json
 import os
 import sys
 import re
+import signal
+import termios
+import tty
+from contextlib import contextmanager
 from pathlib import Path
 from typing import Dict, List, Set
 
@@ -16,6 +20,21 @@ sys.path.insert(0, str(Path(__file__).parent))
 from hook_manager import HookManager
 
 
+@contextmanager
+def _raw_tty(fd):
+    """Put the terminal in raw mode for the duration of the block, yielding the original settings."""
+    old_settings = termios.tcgetattr(fd)
+    tty.setraw(fd)
+    # Keep output post-processing so print() still emits CR+LF
+    mode = termios.tcgetattr(fd)
+    mode[1] |= termios.OPOST
+    termios.tcsetattr(fd, termios.TCSANOW, mode)
+    try:
+        yield old_settings
+    finally:
+        termios.tcsetattr(fd, termios.TCSADRAIN, old_settings)
+
+
 class InteractiveHookSelector:
     """Interactive terminal menu for selecting and managing Claude Code hooks."""
     
@@ -24,6 +43,7 @@ class InteractiveHookSelector:
         self.script_dir = Path(__file__).parent.resolve()
         self.registry_path = self.script_dir / "hook_registry.json"
         self.messages_path = self.script_dir / "hook_messages.json"
+        self._script_dir_files = set(os.listdir(self.script_dir))
         self.global_settings = Path.home() / ".claude" / "settings.json"
         
         # Load registry
@@ -42,6 +62,7 @@ class InteractiveHookSelector:
         
         # UI state
         self.selected_index = 0
+        self._tty_normal = None
         
     def _load_registry(self) -> Dict:
         """Load the hook registry."""
@@ -116,9 +137,12 @@ class InteractiveHookSelector:
             # Add the hook
             script_path = self._get_global_script_path(hook_id)
             
-            # Check if script exists
-            if not Path(script_path).exists():
-                return f"Script not found: {script_path}"
+            # Check if script exists (refresh the listing once before giving up)
+            script_name = hook_info.get("script", "")
+            if script_name not in self._script_dir_files:
+                self._script_dir_files = set(os.listdir(self.script_dir))
+                if script_name not in self._script_dir_files:
+                    return f"Script not found: {script_path}"
             
             success = self.manager.add_hook(
                 event=hook_info["event"],
@@ -210,14 +234,9 @@ class InteractiveHookSelector:
         print("Enter new value (or press Enter to keep current, 'clear' to unset):")
         
         # Restore normal terminal mode for input
-        import termios
-        import tty
-        fd = sys.stdin.fileno()
-        old_settings = termios.tcgetattr(fd)
-        termios.tcsetattr(fd, termios.TCSADRAIN, old_settings)
-        
         try:
-            new_value = input("> ").strip()
+            with self._normal_tty():
+                new_value = input("> ").strip()
         except (KeyboardInterrupt, EOFError):
             return "Configuration cancelled"
         
@@ -247,14 +266,9 @@ class InteractiveHookSelector:
         print("Enter new message (or press Enter to keep current):")
         
         # Restore normal terminal mode for input
-        import termios
-        import tty
-        fd = sys.stdin.fileno()
-        old_settings = termios.tcgetattr(fd)
-        termios.tcsetattr(fd, termios.TCSADRAIN, old_settings)
-        
         try:
-            new_message = input("> ").strip()
+            with self._normal_tty():
+                new_message = input("> ").strip()
         except (KeyboardInterrupt, EOFError):
             return "Message edit cancelled"
         
@@ -275,29 +289,19 @@ class InteractiveHookSelector:
                     f.write(f"export {var_name}={value}\n")
             return
         
-        # Read existing bashrc
-        with open(bashrc_path, 'r') as f:
-            lines = f.readlines()
+        text = bashrc_path.read_text()
         
         # Find and update/remove the variable
-        updated = False
-        new_lines = []
-        for line in lines:
-            if line.strip().startswith(f"export {var_name}="):
-                if value:
-                    new_lines.append(f"export {var_name}={value}\n")
-                    updated = True
-                # Skip line if clearing
-            else:
-                new_lines.append(line)
+        pattern = re.compile(rf'^[ \t]*export {re.escape(var_name)}=.*(?:\n|$)', re.MULTILINE)
+        replacement = f"export {var_name}={value}\n" if value else ""
+        new_text, count = pattern.subn(lambda _: replacement, text)
         
         # Add if not found and value provided
-        if not updated and value:
-            new_lines.append(f"export {var_name}={value}\n")
+        if not count and value:
+            new_text += replacement
         
         # Write back
-        with open(bashrc_path, 'w') as f:
-            f.writelines(new_lines)
+        bashrc_path.write_text(new_text)
     
     def _show_details(self, hook_id: str):
         """Show detailed information about a hook."""
@@ -324,15 +328,22 @@ class InteractiveHookSelector:
         print("Press any key to return...")
         self._get_key()
     
-    def _get_key(self):
-        """Get a single keypress from the user."""
-        import termios
-        import tty
-        
+    @contextmanager
+    def _normal_tty(self):
+        """Temporarily leave raw mode (for input() or child processes)."""
+        if self._tty_normal is None:
+            yield
+            return
         fd = sys.stdin.fileno()
-        old_settings = termios.tcgetattr(fd)
-        
-        tty.setraw(sys.stdin.fileno())
+        raw_settings = termios.tcgetattr(fd)
+        termios.tcsetattr(fd, termios.TCSADRAIN, self._tty_normal)
+        try:
+            yield
+        finally:
+            termios.tcsetattr(fd, termios.TCSADRAIN, raw_settings)
+    
+    def _get_key(self):
+        """Get a single keypress from the user (terminal must already be in raw mode)."""
         key = sys.stdin.read(1)
         
         # Handle arrow keys (they send escape sequences)
@@ -343,99 +354,131 @@ class InteractiveHookSelector:
             elif key == '\x1b[B':  # Down arrow
                 key = 'DOWN'
         
-        termios.tcsetattr(fd, termios.TCSADRAIN, old_settings)
-        
         return key
     
+    def _kill_hook_processes(self) -> str:
+        """Send SIGTERM to running processes whose command line invokes a registered hook script."""
+        if not os.path.isdir('/proc'):
+            # No procfs (e.g. macOS) - fall back to pkill
+            import subprocess
+            try:
+                result = subprocess.run(['sudo', 'pkill', '-f', 'hook'],
+                                      capture_output=True, text=True, timeout=5)
+                if result.returncode == 0:
+                    return "Killed zombie hook processes"
+                return "No hook processes found to kill"
+            except Exception as e:
+                return f"Failed to kill hooks: {str(e)}"
+        
+        targets = {info['script'] for info in self.registry['hooks'].values() if info.get('script')}
+        own_pid = os.getpid()
+        killed = 0
+        
+        for pid in os.listdir('/proc'):
+            if not pid.isdigit() or int(pid) == own_pid:
+                continue
+            try:
+                with open(f'/proc/{pid}/cmdline', 'rb') as f:
+                    args = f.read().split(b'\0')
+            except OSError:
+                continue
+            
+            if any(os.path.basename(arg.decode(errors='replace')) in targets for arg in args if arg):
+                try:
+                    os.kill(int(pid), signal.SIGTERM)
+                    killed += 1
+                except (ProcessLookupError, PermissionError):
+                    pass
+        
+        if killed:
+            return f"Killed {killed} zombie hook process(es)"
+        return "No hook processes found to kill"
+    
     def run(self):
         """Main UI loop."""
         message = ""
         
-        while True:
-            self._display_menu(message)
-            key = self._get_key()
-            
-            if key in ['q', 'Q', '\x03']:  # q or Ctrl+C
-                break
-            
-            elif key in ['UP', 'w', 'W']:
-                if self.selected_index > 0:
-                    self.selected_index -= 1
-                    message = ""
-            
-            elif key in ['DOWN', 's', 'S']:
-                if self.selected_index < len(self.hooks_list) - 1:
-                    self.selected_index += 1
-                    message = ""
-            
-            elif key == ' ':  # Space to toggle
-                if self.selected_index < len(self.hooks_list):
-                    hook_id, hook_info = self.hooks_list[self.selected_index]
-                    message = self._toggle_hook(hook_id)
-            
-            elif key in ['c', 'C']:
-                if self.selected_index < len(self.hooks_list):
-                    hook_id, hook_info = self.hooks_list[self.selected_index]
-                    if hook_info.get("configurable"):
-                        message = self._configure_hook(hook_id, hook_info)
-                    else:
-                        message = "This hook is not configurable"
-            
-            elif key in ['m', 'M']:
-                if self.selected_index < len(self.hooks_list):
-                    hook_id, hook_info = self.hooks_list[self.selected_index]
-                    message = self._edit_message(hook_id, hook_info)
-            
-            elif key in ['d', 'D']:
-                if self.selected_index < len(self.hooks_list):
-                    hook_id, _ = self.hooks_list[self.selected_index]
-                    self._show_details(hook_id)
-                    message = ""
+        with _raw_tty(sys.stdin.fileno()) as normal_settings:
+            self._tty_normal = normal_settings
             
-            elif key in ['i', 'I']:  # Discuss - launch Claude
-                import subprocess
-                import os
+            while True:
+                self._display_menu(message)
+                key = self._get_key()
                 
-                # Save current directory and change to hooks folder
-                original_dir = os.getcwd()
-                os.chdir(self.script_dir)
+                if key in ['q', 'Q', '\x03']:  # q or Ctrl+C
+                    break
                 
-                # Check if there's an existing conversation
-                claude_history = Path(self.script_dir) / '.claude' / 'claude.md'
-                if claude_history.exists():
-                    # Continue existing conversation
-                    subprocess.run(['claude', '--dangerously-skip-permissions', '--continue'])
-                else:
-                    # Start new conversation
-                    subprocess.run(['claude', '--dangerously-skip-permissions'])
+                elif key in ['UP', 'w', 'W']:
+                    if self.selected_index > 0:
+                        self.selected_index -= 1
+                        message = ""
                 
-                # Return to original directory
-                os.chdir(original_dir)
-                message = ""
-            
-            elif key in ['o', 'O']:  # Toggle output level
-                current_level = self.manager.get_output_level()
-                # Cycle through: silent -> error -> all -> silent
-                level_cycle = {"silent": "error", "error": "all", "all": "silent"}
-                new_level = level_cycle.get(current_level, "silent")
-
-                if self.manager.set_output_level(new_level):
-                    message = f"Hook output level set to: {new_level}"
-                else:
-                    message = "Failed to change output level"
+                elif key in ['DOWN', 's', 'S']:
+                    if self.selected_index < len(self.hooks_list) - 1:
+                        self.selected_index += 1
+                        message = ""
+                
+                elif key == ' ':  # Space to toggle
+                    if self.selected_index < len(self.hooks_list):
+                        hook_id, hook_info = self.hooks_list[self.selected_index]
+                        message = self._toggle_hook(hook_id)
+                
+                elif key in ['c', 'C']:
+                    if self.selected_index < len(self.hooks_list):
+                        hook_id, hook_info = self.hooks_list[self.selected_index]
+                        if hook_info.get("configurable"):
+                            message = self._configure_hook(hook_id, hook_info)
+                        else:
+                            message = "This hook is not configurable"
+                
+                elif key in ['m', 'M']:
+                    if self.selected_index < len(self.hooks_list):
+                        hook_id, hook_info = self.hooks_list[self.selected_index]
+                        message = self._edit_message(hook_id, hook_info)
+                
+                elif key in ['d', 'D']:
+                    if self.selected_index < len(self.hooks_list):
+                        hook_id, _ = self.hooks_list[self.selected_index]
+                        self._show_details(hook_id)
+                        message = ""
+                
+                elif key in ['i', 'I']:  # Discuss - launch Claude
+                    import subprocess
+                    import os
+                
+                    # Save current directory and change to hooks folder
+                    original_dir = os.getcwd()
+                    os.chdir(self.script_dir)
+                
+                    # Check if there's an existing conversation
+                    claude_history = Path(self.script_dir) / '.claude' / 'claude.md'
+                    with self._normal_tty():
+                        if claude_history.exists():
+                            # Continue existing conversation
+                            subprocess.run(['claude', '--dangerously-skip-permissions', '--continue'])
+                        else:
+                            # Start new conversation
+                            subprocess.run(['claude', '--dangerously-skip-permissions'])
+                
+                    # Return to original directory
+                    os.chdir(original_dir)
+                    message = ""
+                
+                elif key in ['o', 'O']:  # Toggle output level
+                    current_level = self.manager.get_output_level()
+                    # Cycle through: silent -> error -> all -> silent
+                    level_cycle = {"silent": "error", "error": "all", "all": "silent"}
+                    new_level = level_cycle.get(current_level, "silent")
 
-            elif key in ['k', 'K']:  # Kill zombie hook processes
-                import subprocess
-                try:
-                    result = subprocess.run(['sudo', 'pkill', '-f', 'hook'],
-                                          capture_output=True, text=True, timeout=5)
-                    if result.returncode == 0:
-                        message = "Killed zombie hook processes"
+                    if self.manager.set_output_level(new_level):
+                        message = f"Hook output level set to: {new_level}"
                     else:
-                        message = "No hook processes found to kill"
-                except Exception as e:
-                    message = f"Failed to kill hooks: {str(e)}"
-            
+                        message = "Failed to change output level"
+
+                elif key in ['k', 'K']:  # Kill zombie hook processes
+                    message = self._kill_hook_processes()
+        
+        self._tty_normal = None
     
     def print_summary(self):
         """Print summary after exiting."""
@@ -449,9 +492,6 @@ def main():
         print("Error: This tool requires an interactive terminal")
         sys.exit(1)
     
-    # Check for required termios module
-    import termios
-    
     selector = InteractiveHookSelector()
     selector.run()
     selector.print_summary()
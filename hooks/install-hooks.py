@@ -5,7 +5,10 @@ Reads hooks-installed.json and configures ~/.claude/settings.json
 """
 
 import json
+import os
+import shutil
 import sys
+import tempfile
 from pathlib import Path
 from datetime import datetime
 
@@ -41,16 +44,30 @@ def load_claude_settings():
 def save_claude_settings(settings):
     """Save updated Claude Code settings"""
     settings_file = Path.home() / ".claude" / "settings.json"
+    new_text = json.dumps(settings, indent=4)
+
+    # Skip the write (and the backup) when nothing changed
+    if settings_file.exists() and settings_file.read_text() == new_text:
+        print("Settings unchanged, nothing to write")
+        return settings_file
 
     # Backup current settings
     backup_file = settings_file.parent / f"settings.json.backup.{datetime.now().strftime('%Y%m%d_%H%M%S')}"
     if settings_file.exists():
-        import shutil
         shutil.copy(settings_file, backup_file)
         print(f"Backed up existing settings to {backup_file}")
 
-    with open(settings_file, 'w') as f:
-        json.dump(settings, f, indent=4)
+    # Write to a temp file in the same directory, then atomically swap it in
+    fd, tmp_path = tempfile.mkstemp(dir=settings_file.parent, prefix=".settings.json.")
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(new_text)
+        if settings_file.exists():
+            shutil.copymode(settings_file, tmp_path)
+        os.replace(tmp_path, settings_file)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
 
     return settings_file
 
@@ -63,7 +80,8 @@ def build_hook_configuration(installed_hooks, registry, hooks_dir):
     # Build hooks by event and matcher
     hooks_by_event = {}
 
-    for hook_id in installed_ids:
+    # Sorted so repeated installs produce identical settings
+    for hook_id in sorted(installed_ids):
         if hook_id not in registry["hooks"]:
             print(f"Warning: Hook '{hook_id}' not found in registry, skipping")
             continue
@@ -30,8 +30,23 @@ def check_line_increase(event):
         if not file_path:
             return None
             
-        # Check new content line count
-        new_lines = len(content.splitlines())
+        # Count newlines only until the limit is crossed
+        idx = -1
+        n = 0
+        while n <= max_lines:
+            idx = content.find('\n', idx + 1)
+            if idx < 0:
+                break
+            n += 1
+        
+        if n > max_lines:
+            return {
+                'action': 'stop',
+                'message': f"File would have more than {max_lines} lines, exceeding limit of {max_lines}. Break into smaller files."
+            }
+        
+        # A trailing line without a newline still counts
+        new_lines = n + (1 if content and not content.endswith('\n') else 0)
         
         if new_lines > max_lines:
             return {
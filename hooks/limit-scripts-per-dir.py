@@ -7,7 +7,14 @@ import os
 # If not set or blank, no limit is enforced
 MAX_SCRIPTS = os.environ.get('MAX_SCRIPTS_PER_DIR', '').strip()
 
-input_data = json.load(sys.stdin)
+# Common script extensions (lower-case; names are lower-cased before matching)
+SCRIPT_EXT_TUPLE = (
+    '.py', '.sh', '.bash', '.zsh', '.fish', '.pl', '.rb', '.js', '.ts',
+    '.php', '.go', '.rs', '.java', '.scala', '.kt', '.swift', '.r',
+    '.m', '.lua', '.tcl', '.ps1', '.bat', '.cmd', '.vbs'
+)
+
+input_data = json.loads(sys.stdin.buffer.read())
 tool_name = input_data.get("tool_name", "")
 tool_input = input_data.get("tool_input", {})
 
@@ -27,42 +34,47 @@ if tool_name in ["Write", "Edit", "MultiEdit"]:
     directory = os.path.dirname(file_path)
     filename = os.path.basename(file_path)
     
-    # Common script extensions
-    script_extensions = {
-        '.py', '.sh', '.bash', '.zsh', '.fish', '.pl', '.rb', '.js', '.ts',
-        '.php', '.go', '.rs', '.java', '.scala', '.kt', '.swift', '.r',
-        '.R', '.m', '.lua', '.tcl', '.ps1', '.bat', '.cmd', '.vbs'
-    }
-    
     # Check if this file is a script
-    file_ext = os.path.splitext(filename)[1].lower()
-    if file_ext not in script_extensions:
-        sys.exit(0)
-    
-    # Check if directory exists
-    if not os.path.exists(directory):
+    if not filename.lower().endswith(SCRIPT_EXT_TUPLE):
         sys.exit(0)
     
     # Count existing script files
     script_count = 0
     existing_scripts = []
-    
-    for existing_file in os.listdir(directory):
-        if os.path.isfile(os.path.join(directory, existing_file)):
-            existing_ext = os.path.splitext(existing_file)[1].lower()
-            if existing_ext in script_extensions:
-                script_count += 1
-                existing_scripts.append(existing_file)
+    truncated = False
     
     # Check if adding this file would exceed limit
-    # (Don't count if we're editing an existing file)
-    if not os.path.exists(file_path):
+    # (Don't count if we're editing an existing file - detected during the scan)
+    is_new_file = True
+    
+    # scandir's DirEntry.is_file() uses the readdir file type, avoiding a stat per entry;
+    # opening it also doubles as the directory existence check
+    try:
+        entries = os.scandir(directory)
+    except (FileNotFoundError, NotADirectoryError):
+        sys.exit(0)
+    
+    with entries:
+        for entry in entries:
+            if entry.name == filename:
+                is_new_file = False
+            if entry.is_file():
+                if entry.name.lower().endswith(SCRIPT_EXT_TUPLE):
+                    script_count += 1
+                    existing_scripts.append(entry.name)
+                    # Stop scanning as soon as the limit is known to be exceeded
+                    if script_count > max_limit:
+                        truncated = True
+                        break
+    
+    if is_new_file and not truncated:
         script_count += 1
     
     if script_count > max_limit:
         print("SCRIPT LIMIT EXCEEDED!", file=sys.stderr)
         print("", file=sys.stderr)
-        print(f"Directory already has {len(existing_scripts)} script files", file=sys.stderr)
+        qualifier = "at least " if truncated else ""
+        print(f"Directory already has {qualifier}{len(existing_scripts)} script files", file=sys.stderr)
         print(f"Maximum allowed: {max_limit}", file=sys.stderr)
         print("", file=sys.stderr)
         print("Existing scripts:", file=sys.stderr)
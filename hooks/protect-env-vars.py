@@ -3,6 +3,57 @@ import json
 import re
 import sys
 
+# Patterns that indicate variable modification
+MODIFICATION_PATTERN_SOURCES = [
+    # Direct assignment: VAR=value, export VAR=value
+    r'\b(\w*HUMAN\w*|timeout|BASH_DEFAULT_TIMEOUT_MS|BASH_MAX_TIMEOUT_MS)\s*=',
+    r'\bexport\s+(\w*HUMAN\w*|timeout|BASH_DEFAULT_TIMEOUT_MS|BASH_MAX_TIMEOUT_MS)\s*=',
+    
+    # Using set command: set VAR=value
+    r'\bset\s+(\w*HUMAN\w*|timeout|BASH_DEFAULT_TIMEOUT_MS|BASH_MAX_TIMEOUT_MS)\s*=',
+    
+    # Using declare/typeset: declare VAR=value
+    r'\b(declare|typeset)\s+.*\b(\w*HUMAN\w*|timeout|BASH_DEFAULT_TIMEOUT_MS|BASH_MAX_TIMEOUT_MS)\s*=',
+    
+    # Using unset to remove: unset VAR
+    r'\bunset\s+(\w*HUMAN\w*|timeout|BASH_DEFAULT_TIMEOUT_MS|BASH_MAX_TIMEOUT_MS)\b',
+    
+    # Redirection that overwrites: echo "value" > $VAR
+    r'>\s*\$(\w*HUMAN\w*|timeout|BASH_DEFAULT_TIMEOUT_MS|BASH_MAX_TIMEOUT_MS)\b',
+    
+    # Using eval to modify: eval "VAR=value"
+    r'\beval\s+["\'].*(\w*HUMAN\w*|timeout|BASH_DEFAULT_TIMEOUT_MS|BASH_MAX_TIMEOUT_MS)\s*=',
+    
+    # Using source/. with assignment
+    r'\b(source|\.)\s+.*(\w*HUMAN\w*|timeout|BASH_DEFAULT_TIMEOUT_MS|BASH_MAX_TIMEOUT_MS)\s*=',
+]
+
+# Additional check for indirect modifications through files
+INDIRECT_PATTERN_SOURCES = [
+    # Writing to files that might be sourced later
+    r'echo\s+["\']?\w*HUMAN\w*\s*=.*["\']?\s*>',
+    r'echo\s+["\']?timeout\s*=.*["\']?\s*>',
+    r'printf\s+["\']?\w*HUMAN\w*\s*=.*["\']?\s*>',
+    r'printf\s+["\']?timeout\s*=.*["\']?\s*>',
+]
+
+# All patterns fused into one alternation, each alternative in a named group
+# (mod<i> / ind<i>) so a single finditer pass tells which pattern matched
+COMBINED_PATTERN = re.compile(
+    "|".join(
+        [f"(?P<mod{i}>{p})" for i, p in enumerate(MODIFICATION_PATTERN_SOURCES)]
+        + [f"(?P<ind{i}>{p})" for i, p in enumerate(INDIRECT_PATTERN_SOURCES)]
+    ),
+    re.IGNORECASE,
+)
+# Capture groups nested inside each modification alternative (they hold the variable name)
+MODIFICATION_GROUP_COUNTS = [re.compile(p).groups for p in MODIFICATION_PATTERN_SOURCES]
+
+# Every pattern needs one of these substrings, so commands without them can skip the regexes
+LITERAL_TRIGGERS = ('human', 'timeout', 'bash_default_timeout_ms', 'bash_max_timeout_ms')
+
+PROTECTED_TOKENS = {'timeout', 'bash_default_timeout_ms', 'bash_max_timeout_ms'}
+
 def check_command_for_protected_vars(command):
     """
     Check if a bash command attempts to modify protected environment variables.
@@ -14,69 +65,47 @@ def check_command_for_protected_vars(command):
     """
     issues = []
     
-    # Patterns that indicate variable modification
-    modification_patterns = [
-        # Direct assignment: VAR=value, export VAR=value
-        r'\b(\w*HUMAN\w*|timeout|BASH_DEFAULT_TIMEOUT_MS|BASH_MAX_TIMEOUT_MS)\s*=',
-        r'\bexport\s+(\w*HUMAN\w*|timeout|BASH_DEFAULT_TIMEOUT_MS|BASH_MAX_TIMEOUT_MS)\s*=',
-        
-        # Using set command: set VAR=value
-        r'\bset\s+(\w*HUMAN\w*|timeout|BASH_DEFAULT_TIMEOUT_MS|BASH_MAX_TIMEOUT_MS)\s*=',
-        
-        # Using declare/typeset: declare VAR=value
-        r'\b(declare|typeset)\s+.*\b(\w*HUMAN\w*|timeout|BASH_DEFAULT_TIMEOUT_MS|BASH_MAX_TIMEOUT_MS)\s*=',
-        
-        # Using unset to remove: unset VAR
-        r'\bunset\s+(\w*HUMAN\w*|timeout|BASH_DEFAULT_TIMEOUT_MS|BASH_MAX_TIMEOUT_MS)\b',
+    lowered = command.lower()
+    if not any(t in lowered for t in LITERAL_TRIGGERS):
+        return issues
+    
+    # One pass over the command, dispatching on the alternative that matched.
+    # Matches do not overlap, so a pattern is reported only where it matches first.
+    reported = set()
+    indirect = False
+    for match in COMBINED_PATTERN.finditer(command):
+        name = match.lastgroup
+        if name.startswith('ind'):
+            indirect = True
+            continue
+        if name in reported:
+            continue
+        reported.add(name)
         
-        # Redirection that overwrites: echo "value" > $VAR
-        r'>\s*\$(\w*HUMAN\w*|timeout|BASH_DEFAULT_TIMEOUT_MS|BASH_MAX_TIMEOUT_MS)\b',
+        # Extract the variable name from the capture groups nested in this alternative
+        var_name = None
+        start = COMBINED_PATTERN.groupindex[name]
+        inner = MODIFICATION_GROUP_COUNTS[int(name[3:])]
+        for group in match.groups()[start:start + inner]:
+            if group and ('HUMAN' in group.upper() or group.lower() in PROTECTED_TOKENS):
+                var_name = group
+                break
         
-        # Using eval to modify: eval "VAR=value"
-        r'\beval\s+["\'].*(\w*HUMAN\w*|timeout|BASH_DEFAULT_TIMEOUT_MS|BASH_MAX_TIMEOUT_MS)\s*=',
+        if not var_name:
+            # If we couldn't extract the exact variable, use a generic message
+            var_name = "protected variable"
         
-        # Using source/. with assignment
-        r'\b(source|\.)\s+.*(\w*HUMAN\w*|timeout|BASH_DEFAULT_TIMEOUT_MS|BASH_MAX_TIMEOUT_MS)\s*=',
-    ]
-    
-    # Check for any pattern match
-    for pattern in modification_patterns:
-        match = re.search(pattern, command, re.IGNORECASE)
-        if match:
-            # Extract the variable name that was attempted to be modified
-            var_name = None
-            groups = match.groups()
-            for group in groups:
-                if group and ('HUMAN' in group.upper() or group.lower() == 'timeout' or group in ['BASH_DEFAULT_TIMEOUT_MS', 'BASH_MAX_TIMEOUT_MS']):
-                    var_name = group
-                    break
-            
-            if not var_name:
-                # If we couldn't extract the exact variable, use a generic message
-                var_name = "protected variable"
-            
-            issues.append(f"Attempting to modify protected variable '{var_name}'")
-    
-    # Additional check for indirect modifications through files
-    indirect_patterns = [
-        # Writing to files that might be sourced later
-        r'echo\s+["\']?\w*HUMAN\w*\s*=.*["\']?\s*>',
-        r'echo\s+["\']?timeout\s*=.*["\']?\s*>',
-        r'printf\s+["\']?\w*HUMAN\w*\s*=.*["\']?\s*>',
-        r'printf\s+["\']?timeout\s*=.*["\']?\s*>',
-    ]
-    
-    for pattern in indirect_patterns:
-        if re.search(pattern, command, re.IGNORECASE):
-            issues.append("Attempting indirect modification of protected variables through file operations")
-            break
+        issues.append(f"Attempting to modify protected variable '{var_name}'")
+    
+    if indirect:
+        issues.append("Attempting indirect modification of protected variables through file operations")
     
     return issues
 
 def main():
     try:
         # Read input from stdin
-        input_data = json.load(sys.stdin)
+        input_data = json.loads(sys.stdin.buffer.read())
     except json.JSONDecodeError as e:
         print(f"Error: Invalid JSON input: {e}", file=sys.stderr)
         sys.exit(1)
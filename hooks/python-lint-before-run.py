@@ -1,10 +1,12 @@
 #!/usr/bin/env python3
 import json
 import sys
-import subprocess
 import re
 
-input_data = json.load(sys.stdin)
+# Python script execution: `python[3] [flags] file.py` or `./file.py`, capturing the script path
+PY_EXEC_RE = re.compile(r'(?:\bpython3?\s+(?:-\S+\s+)*|(?=\./))(?P<file>\S*\.py)\b')
+
+input_data = json.loads(sys.stdin.buffer.read())
 tool_name = input_data.get("tool_name", "")
 tool_input = input_data.get("tool_input", {})
 
@@ -12,38 +14,33 @@ if tool_name == "Bash":
     command = tool_input.get("command", "")
     
     # Check for Python script execution
-    python_patterns = [
-        r'\bpython\s+.*\.py\b',
-        r'\bpython3\s+.*\.py\b',
-        r'\.\/.*\.py\b'
-    ]
-    
     is_python_execution = False
     python_file = None
     
-    for pattern in python_patterns:
-        match = re.search(pattern, command)
-        if match:
-            is_python_execution = True
-            # Extract the .py file name
-            py_match = re.search(r'(\S*\.py)', command)
-            if py_match:
-                python_file = py_match.group(1)
-            break
+    match = PY_EXEC_RE.search(command)
+    if match:
+        is_python_execution = True
+        python_file = match.group('file')
     
     if is_python_execution and python_file:
-        # Check if the Python file exists and has syntax errors
-        result = subprocess.run(
-            ['python3', '-m', 'py_compile', python_file],
-            capture_output=True,
-            text=True
-        )
-        
-        if result.returncode != 0:
+        # Check if the Python file exists and has syntax errors (in-process, no interpreter spawn)
+        try:
+            with open(python_file, 'rb') as f:
+                source = f.read()
+            compile(source, python_file, 'exec')
+        except OSError:
+            sys.exit(0)
+        except SyntaxError as e:
+            print("PYTHON SYNTAX ERROR!", file=sys.stderr)
+            print("", file=sys.stderr)
+            location = f" at line {e.lineno}" if e.lineno else ""
+            print(f"Cannot run {python_file} - {e.__class__.__name__}: {e.msg}{location}", file=sys.stderr)
+            sys.exit(2)
+        except ValueError as e:
+            # Null bytes in the source; the interpreter would refuse to run it too
             print("PYTHON SYNTAX ERROR!", file=sys.stderr)
             print("", file=sys.stderr)
-            print(f"Cannot run {python_file} - syntax errors found:", file=sys.stderr)
-            print(result.stderr, file=sys.stderr)
+            print(f"Cannot run {python_file} - {e}", file=sys.stderr)
             sys.exit(2)
 
 sys.exit(0)
\ No newline at end of file
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Run several Claude Code hooks in one Python process.
+
+Usage: runner.py <hook-id-or-script> [<hook-id-or-script> ...]
+
+Each hook is registered as its own command by default, which costs one
+interpreter start per hook per tool call. Pointing a single settings entry at
+this runner instead pays that cost once: stdin is read once and every listed
+hook script is executed in-process with its own copy of the input.
+
+Hooks run in the order given. The first one that exits 2 (blocking error), or
+that prints a decision (action "stop"/"block", decision "block", or continue
+false), decides the result: its output is relayed and the runner stops there.
+Any other non-zero exit is a non-blocking error: it is logged to stderr and
+the remaining hooks still run.
+If none does, stderr from every hook is relayed and their JSON stdout objects
+are merged in order (hookSpecificOutput one level deep). Stdout is either that
+merged JSON or, when no hook printed JSON, the hooks' plain text; the two are
+never mixed, so plain text alongside JSON goes to stderr. Nothing is printed
+when no hook printed anything.
+"""
+
+import io
+import json
+import runpy
+import sys
+import traceback
+from contextlib import redirect_stderr, redirect_stdout
+from pathlib import Path
+
+HOOKS_DIR = Path(__file__).parent.resolve()
+
+
+def resolve_script(name):
+    """Map a registry hook ID or a script filename to a script path."""
+    candidate = HOOKS_DIR / name
+    if candidate.suffix == '.py' and candidate.exists():
+        return candidate
+
+    with open(HOOKS_DIR / "hook_registry.json", 'r') as f:
+        registry = json.load(f)
+    script = registry["hooks"].get(name, {}).get("script", "")
+    if script.endswith('.py'):
+        return HOOKS_DIR / script
+    return None
+
+
+def run_hook(script_path, input_bytes):
+    """Execute one hook script as __main__ and return (exit_code, stdout, stderr)."""
+    out, err = io.StringIO(), io.StringIO()
+    saved_stdin, saved_argv = sys.stdin, sys.argv
+    sys.stdin = io.TextIOWrapper(io.BytesIO(input_bytes), encoding='utf-8')
+    sys.argv = [str(script_path)]
+    code = 0
+
+    try:
+        with redirect_stdout(out), redirect_stderr(err):
+            try:
+                runpy.run_path(str(script_path), run_name="__main__")
+            except SystemExit as e:
+                if e.code is None:
+                    code = 0
+                elif isinstance(e.code, int):
+                    code = e.code
+                else:
+                    print(e.code, file=sys.stderr)
+                    code = 1
+            except Exception:
+                traceback.print_exc()
+                code = 1
+    finally:
+        sys.stdin, sys.argv = saved_stdin, saved_argv
+
+    return code, out.getvalue(), err.getvalue()
+
+
+def parse_output(out):
+    """Return a hook's stdout as a dict if it is a JSON object, else None."""
+    try:
+        result = json.loads(out)
+    except ValueError:
+        return None
+    return result if isinstance(result, dict) else None
+
+
+def is_decision(result):
+    """True if a hook's JSON output blocks or stops the tool call."""
+    return (result.get('action') in ('stop', 'block')
+            or result.get('decision') == 'block'
+            or result.get('continue') is False)
+
+
+def merge_output(merged, result):
+    """Merge one hook's JSON output into merged, combining hookSpecificOutput key by key."""
+    for key, value in result.items():
+        if key == 'hookSpecificOutput' and isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = {**merged[key], **value}
+        else:
+            merged[key] = value
+
+
+def main():
+    names = sys.argv[1:]
+    if not names:
+        print("Usage: runner.py <hook-id-or-script> [...]", file=sys.stderr)
+        sys.exit(1)
+
+    input_bytes = sys.stdin.buffer.read()
+    merged = {}
+    passthrough = []
+
+    for name in names:
+        script_path = resolve_script(name)
+        if script_path is None:
+            print(f"runner: unknown or non-Python hook '{name}', skipping", file=sys.stderr)
+            continue
+
+        code, out, err = run_hook(script_path, input_bytes)
+        sys.stderr.write(err)
+
+        if code == 2:
+            sys.stdout.write(out)
+            sys.exit(code)
+        if code != 0:
+            print(f"runner: hook '{name}' exited {code} (non-blocking), continuing", file=sys.stderr)
+            continue
+
+        if not out.strip():
+            continue
+
+        result = parse_output(out)
+        if result is None:
+            passthrough.append(out)
+        elif is_decision(result):
+            sys.stdout.write(out)
+            sys.exit(0)
+        else:
+            merge_output(merged, result)
+
+    if merged:
+        sys.stderr.write("".join(passthrough))
+        print(json.dumps(merged))
+    else:
+        sys.stdout.write("".join(passthrough))
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
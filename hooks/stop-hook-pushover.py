@@ -6,40 +6,74 @@ Claude Stop hook - sends Pushover notification when Claude finishes responding
 import json
 import sys
 import os
-import subprocess
+import socket
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+# orjson parses transcript lines much faster when available; stdlib json otherwise
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    json_loads = json.loads
+
+try:
+    HOSTNAME = socket.gethostname()
+except Exception:
+    HOSTNAME = "unknown"
+
+def iter_lines_reversed(f, block_size=64 * 1024):
+    """Yield the lines of a binary file from last to first, reading backwards in blocks"""
+    f.seek(0, os.SEEK_END)
+    pos = f.tell()
+    partial = b""
+    
+    while pos > 0:
+        read_size = min(block_size, pos)
+        pos -= read_size
+        f.seek(pos)
+        block = f.read(read_size) + partial
+        lines = block.split(b"\n")
+        # The first piece may continue in the previous block
+        partial = lines.pop(0)
+        for line in reversed(lines):
+            yield line
+    
+    yield partial
+
 def get_last_assistant_response(transcript_path):
     """Extract the last assistant response from transcript"""
     if not os.path.exists(transcript_path):
         return None
     
     try:
-        with open(transcript_path, 'r') as f:
-            lines = f.readlines()
-        
-        # Look for the last assistant response with text content
-        for line in reversed(lines):
-            try:
-                data = json.loads(line.strip())
-                # Check if this is an assistant message
-                if data.get("type") == "assistant" or (data.get("message", {}).get("role") == "assistant"):
-                    # Try different content locations
-                    message = data.get("message", {})
-                    content_array = message.get("content", [])
-                    
-                    # Look for text content in the content array
-                    for item in content_array:
-                        if isinstance(item, dict) and item.get("type") == "text":
-                            text = item.get("text", "")
-                            if text:
-                                return str(text)
-                    
-                    # Fallback to old format
-                    if isinstance(content_array, str) and content_array:
-                        return str(content_array)
-            except:
-                continue
+        with open(transcript_path, 'rb') as f:
+            # Look for the last assistant response with text content
+            for line in iter_lines_reversed(f):
+                # Cheap screen before paying for a JSON parse
+                if b'"assistant"' not in line:
+                    continue
+                try:
+                    data = json_loads(line.strip())
+                    # Check if this is an assistant message
+                    if data.get("type") == "assistant" or (data.get("message", {}).get("role") == "assistant"):
+                        # Try different content locations
+                        message = data.get("message", {})
+                        content_array = message.get("content", [])
+                        
+                        # Look for text content in the content array
+                        for item in content_array:
+                            if isinstance(item, dict) and item.get("type") == "text":
+                                text = item.get("text", "")
+                                if text:
+                                    return str(text)
+                        
+                        # Fallback to old format
+                        if isinstance(content_array, str) and content_array:
+                            return str(content_array)
+                except:
+                    continue
         return None
     except:
         return None
@@ -62,6 +96,17 @@ def clean_text(text, max_length=900):
     
     return text
 
+def read_report_url():
+    """Read the latest report URL written by the report tooling, if any"""
+    try:
+        url_file = os.path.join(os.getcwd(), 'temp', 'latest-report-url.txt')
+        # Opening directly: a missing file costs one failed open, no separate exists()
+        with open(url_file, 'r') as f:
+            return f.read().strip()
+    except:
+        pass  # No report URL, that's fine
+    return None
+
 def send_pushover(message, title):
     """Send Pushover notification"""
     app_token = os.environ.get('PUSHOVER_APP_TOKEN')
@@ -70,19 +115,17 @@ def send_pushover(message, title):
     if not app_token or not user_key:
         return False
     
-    cmd = [
-        'curl', '-s',
-        '-F', f'token={app_token}',
-        '-F', f'user={user_key}',
-        '-F', f'title={title}',
-        '-F', f'message={message}',
-        'https://api.pushover.net/1/messages.json'
-    ]
+    data = urllib.parse.urlencode({
+        'token': app_token,
+        'user': user_key,
+        'title': title,
+        'message': message,
+    }).encode()
+    req = urllib.request.Request('https://api.pushover.net/1/messages.json', data=data)
     
     try:
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=10)
-        if result.returncode == 0:
-            response = json.loads(result.stdout)
+        with urllib.request.urlopen(req, timeout=10) as r:
+            response = json.load(r)
             return response.get('status') == 1
     except:
         pass
@@ -91,17 +134,21 @@ def send_pushover(message, title):
 
 def main():
     """Main hook function"""
+    log_fh = open("/tmp/stop-hook-debug.log", "a")
+    
+    def log(msg):
+        log_fh.write(f"{datetime.now()}: {msg}\n")
+    
     # Always log that we started
-    with open("/tmp/stop-hook-debug.log", "a") as f:
-        f.write(f"\n{datetime.now()}: Hook started\n")
+    log_fh.write("\n")
+    log("Hook started")
     
     try:
         # Read hook input
-        input_data = json.load(sys.stdin)
+        input_data = json.loads(sys.stdin.buffer.read())
         
         # Log the input
-        with open("/tmp/stop-hook-debug.log", "a") as f:
-            f.write(f"{datetime.now()}: Input: {json.dumps(input_data)}\n")
+        log(f"Input: {json.dumps(input_data)}")
         
         # Check if this is a recursive stop hook call
         if input_data.get('stop_hook_active', False):
@@ -113,48 +160,27 @@ def main():
         
         # Extract folder name from transcript path
         folder_name = "Claude"
-        if transcript_path and "-home-ubuntu-" in transcript_path:
+        if transcript_path:
             # Extract from path like /home/ubuntu/.claude/projects/-home-ubuntu-mango/...
-            parts = transcript_path.split("-home-ubuntu-")
-            if len(parts) > 1:
-                folder_name = parts[1].split("/")[0]
+            _, sep, tail = transcript_path.partition("-home-ubuntu-")
+            if sep:
+                folder_name = tail.partition("/")[0]
         
         if transcript_path:
-            # Get the last response
-            response = get_last_assistant_response(transcript_path)
+            # Read the transcript tail and the report URL file concurrently
+            with ThreadPoolExecutor(max_workers=2) as pool:
+                response_future = pool.submit(get_last_assistant_response, transcript_path)
+                report_url_future = pool.submit(read_report_url)
+                response = response_future.result()
+                report_url = report_url_future.result()
             
-            with open("/tmp/stop-hook-debug.log", "a") as f:
-                f.write(f"{datetime.now()}: Transcript path: {transcript_path}\n")
-                f.write(f"{datetime.now()}: Response found: {response is not None}\n")
+            log(f"Transcript path: {transcript_path}")
+            log(f"Response found: {response is not None}")
             
             if response:
-                # Get hostname
-                hostname = "unknown"
-                try:
-                    import socket
-                    hostname = socket.gethostname()
-                except:
-                    # Try subprocess if socket fails
-                    try:
-                        result = subprocess.run(['hostname'], capture_output=True, text=True)
-                        if result.returncode == 0:
-                            hostname = result.stdout.strip()
-                    except:
-                        pass
-                
                 # Clean and format message with hostname
                 clean_response = clean_text(response)
-                clean_response = f"{hostname}: {clean_response}"
-                
-                # Try to read the latest report URL
-                report_url = None
-                try:
-                    url_file = os.path.join(os.getcwd(), 'temp', 'latest-report-url.txt')
-                    if os.path.exists(url_file):
-                        with open(url_file, 'r') as f:
-                            report_url = f.read().strip()
-                except:
-                    pass  # No report URL, that's fine
+                clean_response = f"{HOSTNAME}: {clean_response}"
                 
                 # Add report URL to message if available
                 if report_url:
@@ -162,30 +188,28 @@ def main():
                 
                 title = f"{folder_name} [{session_id}]"
                 
-                with open("/tmp/stop-hook-debug.log", "a") as f:
-                    f.write(f"{datetime.now()}: Sending pushover: {title}\n")
-                    f.write(f"{datetime.now()}: Report URL included: {report_url is not None}\n")
+                log(f"Sending pushover: {title}")
+                log(f"Report URL included: {report_url is not None}")
                 
                 if send_pushover(clean_response, title):
                     # Success - return normal exit
-                    with open("/tmp/stop-hook-debug.log", "a") as f:
-                        f.write(f"{datetime.now()}: Pushover sent successfully\n")
+                    log("Pushover sent successfully")
                     sys.exit(0)
                 else:
-                    with open("/tmp/stop-hook-debug.log", "a") as f:
-                        f.write(f"{datetime.now()}: Pushover failed\n")
+                    log("Pushover failed")
         
         # If we get here, something didn't work but don't block
         sys.exit(0)
         
     except Exception as e:
         # Don't block Claude on errors - but log what happened
-        with open("/tmp/stop-hook-debug.log", "a") as f:
-            f.write(f"{datetime.now()}: EXCEPTION: {str(e)}\n")
-            f.write(f"{datetime.now()}: Exception type: {type(e).__name__}\n")
-            import traceback
-            f.write(f"{datetime.now()}: Traceback:\n{traceback.format_exc()}\n")
+        log(f"EXCEPTION: {str(e)}")
+        log(f"Exception type: {type(e).__name__}")
+        import traceback
+        log(f"Traceback:\n{traceback.format_exc()}")
         sys.exit(0)
+    finally:
+        log_fh.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -11,6 +11,29 @@ from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).parent))
 
+def line_count(s):
+    """Count lines in a string the way splitlines() would for '\\n'-terminated text."""
+    return s.count('\n') + (1 if s and not s.endswith('\n') else 0)
+
+def count_file_lines(file_path, max_lines):
+    """Count lines in a file, stopping early once the count exceeds max_lines."""
+    count = 0
+    last_byte = b'\n'
+    with open(file_path, 'rb') as f:
+        while True:
+            chunk = f.read(65536)
+            if not chunk:
+                break
+            count += chunk.count(b'\n')
+            if count > max_lines:
+                return count
+            last_byte = chunk[-1:]
+    
+    # A final line without a trailing newline still counts
+    if last_byte != b'\n':
+        count += 1
+    return count
+
 def check_file_line_limit(event):
     """Block any edits to files that exceed line limit."""
     
@@ -30,7 +53,7 @@ def check_file_line_limit(event):
     if event.get('tool') == 'Write':
         # Check content being written
         content = params.get('content', '')
-        new_lines = len(content.splitlines())
+        new_lines = line_count(content)
         
         if new_lines > max_lines:
             return {
@@ -42,13 +65,12 @@ def check_file_line_limit(event):
         # Check if file already exceeds limit
         try:
             if Path(file_path).exists():
-                with open(file_path, 'r') as f:
-                    current_lines = len(f.readlines())
+                current_lines = count_file_lines(file_path, max_lines)
                 
                 if current_lines > max_lines:
                     return {
                         'action': 'stop',
-                        'message': f"Cannot edit file with {current_lines} lines (limit: {max_lines}). File is too large - refactor into smaller files first."
+                        'message': f"Cannot edit file with more than {max_lines} lines (limit: {max_lines}). File is too large - refactor into smaller files first."
                     }
                 
                 # For edits, also check if result would exceed limit
@@ -56,8 +78,8 @@ def check_file_line_limit(event):
                     old_string = params.get('old_string', '')
                     new_string = params.get('new_string', '')
                     
-                    old_lines = len(old_string.splitlines())
-                    new_lines = len(new_string.splitlines())
+                    old_lines = line_count(old_string)
+                    new_lines = line_count(new_string)
                     new_total = current_lines - old_lines + new_lines
                     
                     if new_total > max_lines:
@@ -73,7 +95,7 @@ def check_file_line_limit(event):
                     for edit in edits:
                         old_string = edit.get('old_string', '')
                         new_string = edit.get('new_string', '')
-                        net_change += len(new_string.splitlines()) - len(old_string.splitlines())
+                        net_change += line_count(new_string) - line_count(old_string)
                     
                     new_total = current_lines + net_change
                     
@@ -89,7 +111,7 @@ def check_file_line_limit(event):
     return None
 
 if __name__ == "__main__":
-    event = json.loads(sys.stdin.read())
+    event = json.loads(sys.stdin.buffer.read())
     result = check_file_line_limit(event)
     
     if result:
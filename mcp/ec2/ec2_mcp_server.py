@@ -17,13 +17,15 @@ Tools:
 """
 
 import asyncio
-import json
 import os
-import subprocess
 import sys
+import time
 from datetime import datetime, timedelta
 from typing import Any
 
+import botocore.session
+from botocore.config import Config
+from botocore.exceptions import BotoCoreError, ClientError
 from mcp.server import Server
 from mcp.types import Tool, TextContent
 
@@ -32,29 +34,261 @@ aws_access_key_id = os.environ.get("aws_access_key_id", "")
 aws_secret_access_key = os.environ.get("aws_secret_access_key", "")
 aws_default_region = os.environ.get("aws_default_region", "us-east-2")
 
+# One botocore session resolves credentials/config once; its clients keep a
+# pooled keep-alive HTTPS connection to AWS
+_SESSION = botocore.session.Session()
+if aws_access_key_id and aws_secret_access_key:
+    _SESSION.set_credentials(aws_access_key_id, aws_secret_access_key)
+_SESSION.set_config_variable("region", aws_default_region)
+
+_CLIENT_CONFIG = Config(
+    max_pool_connections=50,
+    retries={"mode": "adaptive", "max_attempts": 5},
+)
+_EC2 = _SESSION.create_client("ec2", config=_CLIENT_CONFIG)
+_LOGS = _SESSION.create_client("logs", config=_CLIENT_CONFIG)
+
 app = Server("ec2-server")
 
 
-def run_aws_command(cmd: list[str]) -> dict:
-    """Run AWS CLI command with credentials"""
-    env = {
-        "AWS_ACCESS_KEY_ID": aws_access_key_id,
-        "AWS_SECRET_ACCESS_KEY": aws_secret_access_key,
-        "AWS_DEFAULT_REGION": aws_default_region,
-        "PATH": subprocess.os.environ.get("PATH", "")
-    }
-
-    result = subprocess.run(
-        cmd,
-        capture_output=True,
-        text=True,
-        env=env
-    )
+async def aws_call(fn, **kwargs) -> dict:
+    """Run a blocking boto3 call off the event loop"""
+    return await asyncio.to_thread(fn, **kwargs)
+
+
+def _name_tag(instance: dict) -> str | None:
+    """Return the Name tag of an EC2 instance description, if any"""
+    for tag in instance.get("Tags", []):
+        if tag.get("Key") == "Name":
+            return tag.get("Value")
+    return None
+
+
+class InstanceBatcher:
+    """Coalesce concurrent single-instance lookups into batched DescribeInstances calls.
+
+    Requests queued within ``max_delay`` seconds of each other (up to
+    ``max_batch`` IDs, the EC2 API limit) share one API call, which keeps
+    fan-out across many instances under EC2's request throttle.
+    """
+
+    def __init__(self, max_batch: int = 500, max_delay: float = 0.3):
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._queue: asyncio.Queue | None = None
+        self._worker: asyncio.Task | None = None
+
+    async def get(self, instance_id: str) -> dict | None:
+        """Return the description of ``instance_id`` (None if EC2 doesn't report it)"""
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run())
+
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((instance_id, future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_delay
+
+            while len(batch) < self.max_batch:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            try:
+                await self._resolve(batch)
+            except Exception as e:
+                # Keep the worker alive; anything unexpected fails just this batch
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    async def _resolve(self, batch: list[tuple[str, asyncio.Future]]):
+        ids = list(dict.fromkeys(instance_id for instance_id, _ in batch))
+        try:
+            found = await self._describe(ids)
+        except (BotoCoreError, ClientError) as e:
+            if len(ids) == 1:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+            # One bad ID fails the whole call - resolve each ID on its own instead
+            found = {}
+            errors = {}
+            for instance_id in ids:
+                try:
+                    found.update(await self._describe([instance_id]))
+                except (BotoCoreError, ClientError) as single_error:
+                    errors[instance_id] = single_error
+            for instance_id, future in batch:
+                if instance_id in errors and not future.done():
+                    future.set_exception(errors[instance_id])
 
-    if result.returncode != 0:
-        return {"error": result.stderr, "returncode": result.returncode}
+        for instance_id, future in batch:
+            if not future.done():
+                future.set_result(found.get(instance_id))
 
-    return {"output": result.stdout, "returncode": 0}
+    async def _describe(self, ids: list[str]) -> dict[str, dict]:
+        response = await aws_call(_EC2.describe_instances, InstanceIds=ids)
+        found = {}
+        for reservation in response.get("Reservations", []):
+            for instance in reservation.get("Instances", []):
+                found[instance["InstanceId"]] = instance
+        return found
+
+
+_BATCHER = InstanceBatcher()
+
+
+async def describe_instance(instance_id: str) -> dict | None:
+    """Fetch the description of a single EC2 instance (batched with concurrent lookups)"""
+    instance = await _BATCHER.get(instance_id)
+    if instance:
+        remember_state(instance)
+    return instance
+
+
+# instance_id -> (state name, expiry on the monotonic clock); states change, so keep this short
+_STATE_CACHE: dict[str, tuple[str, float]] = {}
+_STATE_TTL = 60
+
+# States with nothing to diagnose yet
+LIVE_STATES = {"running", "pending"}
+
+
+def remember_state(instance: dict):
+    """Record an instance's state from any DescribeInstances result"""
+    _STATE_CACHE[instance["InstanceId"]] = (instance["State"]["Name"], time.monotonic() + _STATE_TTL)
+
+
+def recent_state(instance_id: str) -> str | None:
+    """Return the instance state seen in the last minute, if any"""
+    cached = _STATE_CACHE.get(instance_id)
+    if cached and time.monotonic() < cached[1]:
+        return cached[0]
+    return None
+
+
+# instance_id -> (Name tag, expiry on the monotonic clock); tags don't change during a run
+_TAG_CACHE: dict[str, tuple[str | None, float]] = {}
+_TAG_TTL = 900
+
+
+async def get_config_tag(instance_id: str) -> str | None:
+    """Return the instance's Name tag, served from a 15-minute cache when possible"""
+    cached = _TAG_CACHE.get(instance_id)
+    if cached and time.monotonic() < cached[1]:
+        return cached[0]
+
+    instance = await describe_instance(instance_id)
+    config_tag = _name_tag(instance) if instance else None
+    _TAG_CACHE[instance_id] = (config_tag, time.monotonic() + _TAG_TTL)
+    return config_tag
+
+
+def invalidate_tag_cache(instance_id: str):
+    """Drop any cached Name tag for an instance"""
+    _TAG_CACHE.pop(instance_id, None)
+
+
+# CloudWatch stream name suffix per log type (stream name is instance_id + suffix)
+STREAM_SUFFIXES = {
+    "training": "",
+    "errors": "_errors",
+    "boot": "_boot",
+    "crashes": "_crashes"
+}
+
+
+def log_group_for(config_tag: str | None) -> str:
+    """Map an instance Name tag to its CloudWatch log group"""
+    # Extract config path from tag (format: configs/path/file.yaml-TIMESTAMP)
+    if config_tag:
+        config_path = config_tag.rsplit("-", 2)[0]  # Remove timestamp
+        return f"/aws/ec2/training/{config_path}"
+    # Fallback: try common log groups
+    return "/aws/ec2/training"
+
+
+# Most events one GetLogEvents call returns
+GET_LOG_EVENTS_LIMIT = 10000
+
+
+def fetch_log_events(log_group: str, instance_id: str, stream_type: str, start_time: int, tail: int) -> list[dict]:
+    """Fetch events for one of an instance's log streams, keeping only the last ``tail`` (0 = all).
+
+    A tail is read newest-first from the exact stream with GetLogEvents
+    (startFromHead=False), paging backwards only if it exceeds one response.
+    Fetching everything pages through FilterLogEvents with a stream-name
+    prefix, so results beyond a single 1 MB / 10k-event response are not
+    silently dropped. The un-suffixed training stream is a prefix of the other
+    streams, so their events are excluded when the training stream is requested.
+    """
+    log_stream = f"{instance_id}{STREAM_SUFFIXES.get(stream_type, '')}"
+
+    if tail > 0:
+        events = []
+        params = {
+            "logGroupName": log_group,
+            "logStreamName": log_stream,
+            "startTime": start_time,
+            "startFromHead": False,
+            "limit": min(tail, GET_LOG_EVENTS_LIMIT),
+        }
+        while len(events) < tail:
+            response = _LOGS.get_log_events(**params)
+            batch = response.get("events", [])
+            events[:0] = batch
+            token = response.get("nextBackwardToken")
+            if not batch or not token or token == params.get("nextToken"):
+                break
+            params["nextToken"] = token
+            params["limit"] = min(tail - len(events), GET_LOG_EVENTS_LIMIT)
+        return events[-tail:]
+
+    other_streams = set()
+    if log_stream == instance_id:
+        other_streams = {f"{instance_id}{suffix}" for suffix in STREAM_SUFFIXES.values() if suffix}
+
+    events = []
+    paginator = _LOGS.get_paginator("filter_log_events")
+    pages = paginator.paginate(
+        logGroupName=log_group,
+        logStreamNamePrefix=log_stream,
+        startTime=start_time,
+        PaginationConfig={"PageSize": 10000},
+    )
+    for page in pages:
+        for event in page.get("events", []):
+            if event.get("logStreamName") not in other_streams:
+                events.append(event)
+    return events
+
+
+def format_events(events: list[dict]) -> list[str]:
+    """Render events as ``[YYYY-mm-dd HH:MM:SS] message`` lines.
+
+    Uses time.strftime on whole seconds rather than building a datetime per
+    event, and reuses the prefix while consecutive events share a second.
+    """
+    lines = []
+    last_sec, prefix = None, ""
+    for event in events:
+        sec = event["timestamp"] // 1000
+        if sec != last_sec:
+            last_sec = sec
+            prefix = time.strftime("[%Y-%m-%d %H:%M:%S] ", time.localtime(sec))
+        lines.append(prefix + event["message"].rstrip())
+    return lines
 
 
 @app.list_tools()
@@ -124,6 +358,11 @@ async def list_tools() -> list[Tool]:
                         "type": "string",
                         "description": "Crashed EC2 instance ID",
                     },
+                    "force": {
+                        "type": "boolean",
+                        "description": "Fetch logs even if the instance is running or pending (default: false)",
+                        "default": False,
+                    },
                 },
                 "required": ["instance_id"],
             },
@@ -138,44 +377,39 @@ async def call_tool(name: str, arguments: Any) -> list[TextContent]:
     if name == "list_instances":
         state_filter = arguments.get("state")
 
-        # Build AWS CLI command
-        cmd = [
-            "aws", "ec2", "describe-instances",
-            "--query", "Reservations[*].Instances[*].{ID:InstanceId,State:State.Name,Type:InstanceType,Launch:LaunchTime,IP:PrivateIpAddress,Name:Tags[?Key==`Name`].Value|[0]}",
-            "--output", "json"
-        ]
-
+        filters = []
         if state_filter:
-            cmd.extend(["--filters", f"Name=instance-state-name,Values={state_filter}"])
-
-        result = run_aws_command(cmd)
+            filters.append({"Name": "instance-state-name", "Values": [state_filter]})
 
-        if result.get("error"):
-            return [TextContent(type="text", text=f"Error: {result['error']}")]
+        def fetch_all() -> list[dict]:
+            paginator = _EC2.get_paginator("describe_instances")
+            found = []
+            for page in paginator.paginate(Filters=filters):
+                for reservation in page.get("Reservations", []):
+                    found.extend(reservation.get("Instances", []))
+            return found
 
         try:
-            instances_data = json.loads(result["output"])
-            instances = []
-            for reservation in instances_data:
-                instances.extend(reservation)
-
-            if not instances:
-                return [TextContent(type="text", text="No EC2 instances found")]
-
-            # Format output
-            output = [f"Found {len(instances)} EC2 instances:\n"]
-            for inst in instances:
-                output.append(f"\nInstance: {inst['ID']}")
-                output.append(f"  State: {inst['State']}")
-                output.append(f"  Type: {inst['Type']}")
-                output.append(f"  IP: {inst.get('IP', 'N/A')}")
-                output.append(f"  Launch: {inst.get('Launch', 'N/A')}")
-                output.append(f"  Name: {inst.get('Name', 'N/A')}")
-
-            return [TextContent(type="text", text="\n".join(output))]
-
-        except json.JSONDecodeError as e:
-            return [TextContent(type="text", text=f"Error parsing AWS response: {e}")]
+            instances = await asyncio.to_thread(fetch_all)
+        except (BotoCoreError, ClientError) as e:
+            return [TextContent(type="text", text=f"Error: {e}")]
+
+        if not instances:
+            return [TextContent(type="text", text="No EC2 instances found")]
+
+        # Format output
+        output = [f"Found {len(instances)} EC2 instances:\n"]
+        for inst in instances:
+            remember_state(inst)
+            launch = inst.get("LaunchTime")
+            output.append(f"\nInstance: {inst['InstanceId']}")
+            output.append(f"  State: {inst['State']['Name']}")
+            output.append(f"  Type: {inst['InstanceType']}")
+            output.append(f"  IP: {inst.get('PrivateIpAddress', 'N/A')}")
+            output.append(f"  Launch: {launch.isoformat() if launch else 'N/A'}")
+            output.append(f"  Name: {_name_tag(inst) or 'N/A'}")
+
+        return [TextContent(type="text", text="\n".join(output))]
 
     elif name == "get_instance_logs":
         instance_id = arguments["instance_id"]
@@ -188,147 +422,119 @@ async def call_tool(name: str, arguments: Any) -> list[TextContent]:
 
         # Determine log group and stream name
         # First, get instance tags to find config name
-        cmd = [
-            "aws", "ec2", "describe-instances",
-            "--instance-ids", instance_id,
-            "--query", "Reservations[0].Instances[0].Tags[?Key==`Name`].Value|[0]",
-            "--output", "text"
-        ]
-
-        result = run_aws_command(cmd)
-        if result.get("error"):
-            return [TextContent(type="text", text=f"Error getting instance info: {result['error']}")]
-
-        config_tag = result["output"].strip()
-
-        # Extract config path from tag (format: configs/path/file.yaml-TIMESTAMP)
-        if config_tag and config_tag != "None":
-            config_path = config_tag.rsplit("-", 2)[0]  # Remove timestamp
-            log_group = f"/aws/ec2/training/{config_path}"
-        else:
-            # Fallback: try common log groups
-            log_group = "/aws/ec2/training"
+        try:
+            config_tag = await get_config_tag(instance_id)
+        except (BotoCoreError, ClientError) as e:
+            return [TextContent(type="text", text=f"Error getting instance info: {e}")]
+
+        log_group = log_group_for(config_tag)
 
         # Determine stream name suffix
-        stream_suffix = {
-            "training": "",
-            "errors": "_errors",
-            "boot": "_boot",
-            "crashes": "_crashes"
-        }.get(stream_type, "")
+        stream_suffix = STREAM_SUFFIXES.get(stream_type, "")
 
         log_stream = f"{instance_id}{stream_suffix}"
 
         # Fetch logs
-        cmd = [
-            "aws", "logs", "get-log-events",
-            "--log-group-name", log_group,
-            "--log-stream-name", log_stream,
-            "--start-time", str(start_time),
-            "--output", "json"
-        ]
-
-        if tail > 0:
-            cmd.extend(["--limit", str(tail)])
-
-        result = run_aws_command(cmd)
-
-        if result.get("error"):
-            return [TextContent(type="text", text=f"CloudWatch Error: {result['error']}\n\nLog Group: {log_group}\nLog Stream: {log_stream}")]
-
         try:
-            logs_data = json.loads(result["output"])
-            events = logs_data.get("events", [])
-
-            if not events:
-                return [TextContent(type="text", text=f"No log events found\n\nLog Group: {log_group}\nLog Stream: {log_stream}\nTime Range: Last {hours_back} hours")]
+            events = await asyncio.to_thread(fetch_log_events, log_group, instance_id, stream_type, start_time, int(tail))
+        except (BotoCoreError, ClientError) as e:
+            return [TextContent(type="text", text=f"CloudWatch Error: {e}\n\nLog Group: {log_group}\nLog Stream: {log_stream}")]
 
-            # Format logs
-            output = [f"CloudWatch Logs for {instance_id} ({stream_type})"]
-            output.append(f"Log Group: {log_group}")
-            output.append(f"Log Stream: {log_stream}")
-            output.append(f"Events: {len(events)}")
-            output.append("=" * 80 + "\n")
+        if not events:
+            return [TextContent(type="text", text=f"No log events found\n\nLog Group: {log_group}\nLog Stream: {log_stream}\nTime Range: Last {hours_back} hours")]
 
-            for event in events[-tail:] if tail > 0 else events:
-                timestamp = datetime.fromtimestamp(event["timestamp"] / 1000).strftime("%Y-%m-%d %H:%M:%S")
-                message = event["message"].rstrip()
-                output.append(f"[{timestamp}] {message}")
+        # Format logs
+        output = [f"CloudWatch Logs for {instance_id} ({stream_type})"]
+        output.append(f"Log Group: {log_group}")
+        output.append(f"Log Stream: {log_stream}")
+        output.append(f"Events: {len(events)}")
+        output.append("=" * 80 + "\n")
 
-            return [TextContent(type="text", text="\n".join(output))]
+        output.extend(format_events(events))
 
-        except json.JSONDecodeError as e:
-            return [TextContent(type="text", text=f"Error parsing CloudWatch response: {e}")]
+        return [TextContent(type="text", text="\n".join(output))]
 
     elif name == "monitor_instance":
         instance_id = arguments["instance_id"]
 
         # Get instance details
-        cmd = [
-            "aws", "ec2", "describe-instances",
-            "--instance-ids", instance_id,
-            "--query", "Reservations[0].Instances[0].{State:State.Name,Type:InstanceType,Launch:LaunchTime,IP:PrivateIpAddress}",
-            "--output", "json"
-        ]
-
-        result = run_aws_command(cmd)
-
-        if result.get("error"):
-            return [TextContent(type="text", text=f"Error: {result['error']}")]
-
         try:
-            instance = json.loads(result["output"])
+            instance = await describe_instance(instance_id)
+        except (BotoCoreError, ClientError) as e:
+            return [TextContent(type="text", text=f"Error: {e}")]
+
+        if not instance:
+            return [TextContent(type="text", text=f"Error: instance {instance_id} not found")]
 
-            output = [f"EC2 Instance Monitor: {instance_id}\n"]
-            output.append(f"State: {instance['State']}")
-            output.append(f"Type: {instance['Type']}")
-            output.append(f"IP: {instance.get('IP', 'N/A')}")
-            output.append(f"Launch: {instance.get('Launch', 'N/A')}")
+        state = instance["State"]["Name"]
+        launch_time = instance.get("LaunchTime")
 
-            # Calculate runtime if running
-            if instance['State'] == 'running' and instance.get('Launch'):
-                launch_time = datetime.fromisoformat(instance['Launch'].replace('Z', '+00:00'))
-                runtime = datetime.now(launch_time.tzinfo) - launch_time
-                hours = runtime.total_seconds() / 3600
-                output.append(f"Runtime: {hours:.2f} hours")
+        output = [f"EC2 Instance Monitor: {instance_id}\n"]
+        output.append(f"State: {state}")
+        output.append(f"Type: {instance['InstanceType']}")
+        output.append(f"IP: {instance.get('PrivateIpAddress', 'N/A')}")
+        output.append(f"Launch: {launch_time.isoformat() if launch_time else 'N/A'}")
 
-            return [TextContent(type="text", text="\n".join(output))]
+        # Calculate runtime if running
+        if state == 'running' and launch_time:
+            runtime = datetime.now(launch_time.tzinfo) - launch_time
+            hours = runtime.total_seconds() / 3600
+            output.append(f"Runtime: {hours:.2f} hours")
 
-        except json.JSONDecodeError as e:
-            return [TextContent(type="text", text=f"Error parsing response: {e}")]
+        return [TextContent(type="text", text="\n".join(output))]
 
     elif name == "diagnose_crash":
         instance_id = arguments["instance_id"]
+        force = arguments.get("force", False)
 
-        # Get instance state
-        cmd = [
-            "aws", "ec2", "describe-instances",
-            "--instance-ids", instance_id,
-            "--query", "Reservations[0].Instances[0].{State:State.Name,StateReason:StateReason.Message}",
-            "--output", "json"
-        ]
-
-        result = run_aws_command(cmd)
+        # A recently seen live instance has not crashed - skip the EC2 and log calls
+        state = recent_state(instance_id)
+        if state in LIVE_STATES and not force:
+            return [TextContent(type="text", text=f"Instance {instance_id} is still {state}; nothing to diagnose (pass force=true to fetch logs anyway)")]
 
-        if result.get("error"):
-            return [TextContent(type="text", text=f"Error: {result['error']}")]
+        invalidate_tag_cache(instance_id)
 
+        # Get instance state
         try:
-            instance = json.loads(result["output"])
-
-            output = [f"Crash Diagnosis for {instance_id}\n"]
-            output.append(f"State: {instance['State']}")
-            output.append(f"State Reason: {instance.get('StateReason', 'N/A')}")
-            output.append("\nAnalyzing error logs...\n")
-
-            # Fetch error logs (delegate to get_instance_logs logic)
-            # This is a simplified version - full implementation would check all log streams
-            output.append("Run get_instance_logs with stream_type='errors' for detailed error analysis")
-
-            return [TextContent(type="text", text="\n".join(output))]
+            instance = await describe_instance(instance_id)
+        except (BotoCoreError, ClientError) as e:
+            return [TextContent(type="text", text=f"Error: {e}")]
+
+        if not instance:
+            return [TextContent(type="text", text=f"Error: instance {instance_id} not found")]
+
+        state = instance["State"]["Name"]
+        if state in LIVE_STATES and not force:
+            return [TextContent(type="text", text=f"Instance {instance_id} is still {state}; nothing to diagnose (pass force=true to fetch logs anyway)")]
+
+        output = [f"Crash Diagnosis for {instance_id}\n"]
+        output.append(f"State: {state}")
+        output.append(f"State Reason: {instance.get('StateReason', {}).get('Message', 'N/A')}")
+        output.append("\nAnalyzing error logs...\n")
+
+        # Fetch the diagnostic streams concurrently - they are independent round trips
+        log_group = log_group_for(_name_tag(instance))
+        start_time = int((datetime.now() - timedelta(hours=24)).timestamp() * 1000)
+        stream_types = ["errors", "crashes", "boot"]
+        results = await asyncio.gather(
+            *(asyncio.to_thread(fetch_log_events, log_group, instance_id, stream_type, start_time, 50)
+              for stream_type in stream_types),
+            return_exceptions=True,
+        )
 
-        except json.JSONDecodeError as e:
-            return [TextContent(type="text", text=f"Error parsing response: {e}")]
+        output.append(f"Log Group: {log_group}")
+        for stream_type, result in zip(stream_types, results):
+            output.append("\n" + "=" * 80)
+            output.append(f"{stream_type} ({instance_id}{STREAM_SUFFIXES[stream_type]})")
+            output.append("=" * 80)
+            if isinstance(result, Exception):
+                output.append(f"CloudWatch Error: {result}")
+            elif not result:
+                output.append("No log events in the last 24 hours")
+            else:
+                output.extend(format_events(result))
+
+        return [TextContent(type="text", text="\n".join(output))]
 
     else:
         return [TextContent(type="text", text=f"Unknown tool: {name}")]
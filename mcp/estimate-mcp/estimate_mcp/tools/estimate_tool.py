@@ -3,14 +3,202 @@ EstimateTool - Analyzes filesystem timestamps to provide fact-based completion e
 """
 
 import os
+import re
 import glob
-from pathlib import Path
+import time
+import fnmatch
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path, PurePath
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Dict, Iterator, List, Optional, Tuple
+import numpy as np
 from pydantic import BaseModel, Field
 
 from .base_tool import BaseTool
 
+# Filesystems where each stat() is a network round trip
+NETWORK_FS_TYPES = frozenset({
+    'nfs', 'nfs4', 'cifs', 'smbfs', 'smb3', '9p', 'lustre', 'gpfs', 'beegfs',
+    'ceph', 'glusterfs', 'fuse.glusterfs', 'fuse.s3fs', 'fuse.sshfs',
+    'fuse.gcsfuse', 'fuse.rclone', 'fuse.mountpoint-s3',
+})
+STAT_WORKERS = 32
+
+def _is_network_fs(path: str) -> bool:
+    """Return True if path lives on a network filesystem, per /proc/self/mounts."""
+    try:
+        with open('/proc/self/mounts') as f:
+            mounts = [line.split()[1:3] for line in f]
+    except OSError:
+        return False
+
+    real = os.path.realpath(path or '.')
+    best, fstype = '', ''
+    for mount_point, mount_type in mounts:
+        mount_point = mount_point.replace('\\040', ' ')
+        if real == mount_point or real.startswith(mount_point.rstrip('/') + '/'):
+            if len(mount_point) > len(best):
+                best, fstype = mount_point, mount_type
+    return fstype in NETWORK_FS_TYPES
+
+# Compiled form of each pattern seen: (root, parts, per-part matchers, on network fs)
+_PATTERN_CACHE: Dict[str, tuple] = {}
+
+# Directory listings reused while the directory's mtime is unchanged:
+# path -> (st_mtime_ns, [(name, is_dir), ...])
+_LISTING_CACHE: Dict[str, Tuple[int, List[Tuple[str, bool]]]] = {}
+
+# Listings of directories modified more recently than this are not cached, since
+# a further change within the filesystem's timestamp granularity would go unseen
+RACY_WINDOW_NS = 2_000_000_000
+
+def _compile_pattern(pattern: str) -> tuple:
+    """Split a glob pattern into parts and compile its wildcard parts once."""
+    compiled = _PATTERN_CACHE.get(pattern)
+    if compiled is not None:
+        return compiled
+
+    parts = PurePath(pattern).parts
+    if os.path.isabs(pattern):
+        root, parts = parts[0], parts[1:]
+    else:
+        root = ''
+
+    # None for '**' and literal parts, a regex match function for wildcards
+    matchers = [
+        re.compile(fnmatch.translate(part)).match
+        if part != '**' and glob.has_magic(part) else None
+        for part in parts
+    ]
+
+    # Deepest directory before the first wildcard decides which mount we are on
+    static = [root]
+    for part in parts[:-1]:
+        if glob.has_magic(part):
+            break
+        static.append(part)
+
+    compiled = (root, parts, matchers, _is_network_fs(os.path.join(*static)))
+    _PATTERN_CACHE[pattern] = compiled
+    return compiled
+
+def _list_dir(dirpath: str) -> List[Tuple[str, bool]]:
+    """Return (name, is_dir) for each entry, rescanning only if the directory changed."""
+    path = dirpath or '.'
+    try:
+        st = os.stat(path)
+    except OSError:
+        _LISTING_CACHE.pop(dirpath, None)
+        return []
+
+    cached = _LISTING_CACHE.get(dirpath)
+    if cached is not None and cached[0] == st.st_mtime_ns:
+        return cached[1]
+
+    try:
+        with os.scandir(path) as it:
+            listing = [(entry.name, entry.is_dir()) for entry in it]
+    except OSError:
+        return []
+
+    if time.time_ns() - st.st_mtime_ns > RACY_WINDOW_NS:
+        _LISTING_CACHE[dirpath] = (st.st_mtime_ns, listing)
+    else:
+        _LISTING_CACHE.pop(dirpath, None)
+    return listing
+
+def _mtime(path: str) -> Optional[float]:
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return None
+
+def _scan_glob(pattern: str) -> Iterator[Tuple[str, float]]:
+    """
+    Yield (path, mtime) for every path matching a glob pattern.
+
+    Walks only the subtrees the pattern can match, instead of glob.glob
+    building the full match list and each file being stat'ed afterwards.
+    The pattern is compiled once per process, and directory listings are
+    reused across calls while a directory's mtime is unchanged, so repeated
+    polls only rescan directories that gained or lost entries. On network
+    filesystems the stats are latency-bound, so there they are overlapped in
+    a thread pool. Follows glob.glob(recursive=True) semantics: '**' matches
+    zero or more directories and wildcards do not match names starting with '.'.
+    """
+    pattern_parts = PurePath(pattern).parts
+    if not pattern_parts:
+        return
+
+    # PurePath drops a trailing separator (which restricts matches to
+    # directories), and a trailing '**' also matches the starting directory
+    # itself; glob.glob handles both, so leave those patterns to it
+    if pattern.endswith(('/', os.sep)) or pattern_parts[-1] == '**':
+        for path in glob.glob(pattern, recursive=True):
+            mtime = _mtime(path)
+            if mtime is not None:
+                yield path, mtime
+        return
+
+    root, parts, matchers, network = _compile_pattern(pattern)
+    if not parts:
+        return
+
+    def walk(dirpath: str, idx: int) -> Iterator[str]:
+        part = parts[idx]
+        last = idx == len(parts) - 1
+
+        if part == '**':
+            # Zero directories: continue matching the rest of the pattern here
+            if not last:
+                yield from walk(dirpath, idx + 1)
+            for name, is_dir in _list_dir(dirpath):
+                if name.startswith('.'):
+                    continue
+                path = os.path.join(dirpath, name)
+                if last:
+                    yield path
+                if is_dir:
+                    # One or more directories: stay on '**' one level deeper
+                    yield from walk(path, idx)
+            return
+
+        match = matchers[idx]
+        if match is None:
+            path = os.path.join(dirpath, part)
+            if last:
+                yield path
+            elif os.path.isdir(path):
+                yield from walk(path, idx + 1)
+            return
+
+        hidden_ok = part.startswith('.')
+        for name, is_dir in _list_dir(dirpath):
+            if name.startswith('.') and not hidden_ok:
+                continue
+            if not match(name):
+                continue
+            path = os.path.join(dirpath, name)
+            if last:
+                yield path
+            elif is_dir:
+                yield from walk(path, idx + 1)
+
+    if network:
+        found = list(walk(root, 0))
+        if not found:
+            return
+        with ThreadPoolExecutor(max_workers=min(STAT_WORKERS, len(found))) as ex:
+            for path, mtime in zip(found, ex.map(_mtime, found)):
+                if mtime is not None:
+                    yield path, mtime
+        return
+
+    for path in walk(root, 0):
+        mtime = _mtime(path)
+        if mtime is not None:
+            yield path, mtime
+
 class EstimateInput(BaseModel):
     """Input schema for EstimateTool."""
     pattern: str = Field(..., description="Glob pattern for completed files (e.g., 'data/*/DONE')")
@@ -64,6 +252,8 @@ class EstimateTool(BaseTool[EstimateInput, EstimateOutput]):
 
         Returns:
             An instance of EstimateOutput with measured statistics.
+            Built with model_construct: every field is computed here from
+            trusted numerics, so per-call validation is skipped.
         """
         pattern = input_obj.pattern
         total_expected = input_obj.total
@@ -72,10 +262,14 @@ class EstimateTool(BaseTool[EstimateInput, EstimateOutput]):
         if base_dir:
             pattern = str(Path(base_dir) / pattern)
 
+        # Walk and stat in one pass; only the mtimes are needed downstream
         try:
-            files = glob.glob(pattern, recursive=True)
+            mtimes = np.fromiter(
+                (mtime for _, mtime in _scan_glob(pattern)),
+                dtype=np.float64,
+            )
         except Exception as e:
-            return EstimateOutput(
+            return EstimateOutput.model_construct(
                 pattern=pattern,
                 completed=0,
                 total=total_expected,
@@ -84,8 +278,8 @@ class EstimateTool(BaseTool[EstimateInput, EstimateOutput]):
                 error=f"Error globbing pattern: {str(e)}"
             )
 
-        if not files:
-            return EstimateOutput(
+        if not mtimes.size:
+            return EstimateOutput.model_construct(
                 pattern=pattern,
                 completed=0,
                 total=total_expected,
@@ -94,37 +288,12 @@ class EstimateTool(BaseTool[EstimateInput, EstimateOutput]):
                 error=f"No files found matching pattern: {pattern}"
             )
 
-        # Get timestamps
-        timestamps = []
-        for f in files:
-            try:
-                stat = os.stat(f)
-                timestamps.append({
-                    'file': f,
-                    'timestamp': stat.st_mtime
-                })
-            except OSError:
-                continue
-
-        if not timestamps:
-            return EstimateOutput(
-                pattern=pattern,
-                completed=0,
-                total=total_expected,
-                remaining=total_expected,
-                percent_complete=0.0,
-                error="Could not read timestamps from files"
-            )
-
-        # Sort chronologically
-        timestamps.sort(key=lambda x: x['timestamp'])
-
-        completed = len(timestamps)
+        completed = int(mtimes.size)
         remaining = total_expected - completed
 
-        # Measured time span
-        first_ts = timestamps[0]['timestamp']
-        last_ts = timestamps[-1]['timestamp']
+        # Measured time span (only the extremes are needed, no full sort)
+        first_ts = float(mtimes.min())
+        last_ts = float(mtimes.max())
 
         elapsed_seconds = last_ts - first_ts
         elapsed_hours = elapsed_seconds / 3600
@@ -150,15 +319,39 @@ class EstimateTool(BaseTool[EstimateInput, EstimateOutput]):
             eta_datetime = None
 
         # Recent rate (last 10 files)
-        if len(timestamps) >= 10:
-            recent_first = timestamps[-10]['timestamp']
-            recent_last = timestamps[-1]['timestamp']
+        if completed >= 10:
+            # 10th-newest timestamp via an O(N) partial sort
+            recent_first = float(np.partition(mtimes, completed - 10)[completed - 10])
+            recent_last = last_ts
             recent_elapsed = recent_last - recent_first
             recent_rate = 9 / (recent_elapsed / 3600) if recent_elapsed > 0 else None
         else:
             recent_rate = None
 
-        return EstimateOutput(
+        # Round all statistics in one pass. Missing (None -> NaN) or zero values
+        # become None, matching `round(x, 2) if x else None`; that check is made
+        # on the unrounded values, so small nonzero stats still round to 0.0
+        stats = np.array([
+            elapsed_seconds,
+            elapsed_hours,
+            elapsed_hours / 24,
+            avg_seconds_per_file,
+            avg_minutes_per_file,
+            files_per_hour,
+            recent_rate,
+            hours_remaining,
+            days_remaining,
+        ], dtype=np.float64)
+        (
+            elapsed_seconds_r, elapsed_hours_r, elapsed_days_r,
+            avg_seconds_r, avg_minutes_r, files_per_hour_r,
+            recent_rate_r, hours_remaining_r, days_remaining_r,
+        ) = [
+            v if keep else None
+            for v, keep in zip(np.round(stats, 2).tolist(), (~np.isnan(stats) & (stats != 0)).tolist())
+        ]
+
+        return EstimateOutput.model_construct(
             pattern=pattern,
             completed=completed,
             total=total_expected,
@@ -168,18 +361,18 @@ class EstimateTool(BaseTool[EstimateInput, EstimateOutput]):
             first_timestamp=datetime.fromtimestamp(first_ts).isoformat(),
             last_timestamp=datetime.fromtimestamp(last_ts).isoformat(),
 
-            elapsed_seconds=round(elapsed_seconds, 2) if elapsed_seconds else None,
-            elapsed_hours=round(elapsed_hours, 2) if elapsed_hours else None,
-            elapsed_days=round(elapsed_hours / 24, 2) if elapsed_hours else None,
+            elapsed_seconds=elapsed_seconds_r,
+            elapsed_hours=elapsed_hours_r,
+            elapsed_days=elapsed_days_r,
 
-            avg_seconds_per_file=round(avg_seconds_per_file, 2) if avg_seconds_per_file else None,
-            avg_minutes_per_file=round(avg_minutes_per_file, 2) if avg_minutes_per_file else None,
-            files_per_hour=round(files_per_hour, 2) if files_per_hour else None,
+            avg_seconds_per_file=avg_seconds_r,
+            avg_minutes_per_file=avg_minutes_r,
+            files_per_hour=files_per_hour_r,
 
-            recent_files_per_hour=round(recent_rate, 2) if recent_rate else None,
+            recent_files_per_hour=recent_rate_r,
 
-            hours_remaining=round(hours_remaining, 2) if hours_remaining else None,
-            days_remaining=round(days_remaining, 2) if days_remaining else None,
+            hours_remaining=hours_remaining_r,
+            days_remaining=days_remaining_r,
             eta_timestamp=eta_datetime.isoformat() if eta_datetime else None,
             eta_human=eta_datetime.strftime('%Y-%m-%d %H:%M') if eta_datetime else None
         )
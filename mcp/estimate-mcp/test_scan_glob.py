@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Check that EstimateTool's _scan_glob matches glob.glob(recursive=True)
+"""
+
+import glob
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from estimate_mcp.tools.estimate_tool import _scan_glob
+
+PATTERNS = [
+    "t/*", "t/*/DONE", "t/**", "t/**/", "t/**/DONE", "t/**/*.log",
+    "t/a", "t/a/", "t/a/b/", "t/*/", "t/a/**", "t/a/**/", "t/missing/",
+    "t/.hidden/*", "t/**/.hidden",
+]
+
+def make_tree(base):
+    """Small tree with nested dirs, files and a hidden directory"""
+    for rel in ["t/a/b/DONE", "t/a/run.log", "t/c/DONE", "t/c/d/e/x.log",
+                "t/.hidden/DONE", "t/top.txt"]:
+        path = os.path.join(base, rel)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write("x")
+
+def test_matches_glob():
+    """Every pattern yields exactly the paths glob.glob returns, relative and absolute"""
+    with tempfile.TemporaryDirectory() as base:
+        make_tree(base)
+        cwd = os.getcwd()
+        os.chdir(base)
+        try:
+            failures = []
+            for pattern in PATTERNS + [os.path.join(base, p) for p in PATTERNS]:
+                expected = sorted(glob.glob(pattern, recursive=True))
+                actual = sorted(path for path, _ in _scan_glob(pattern))
+                if actual != expected:
+                    failures.append(f"{pattern}: expected {expected}, got {actual}")
+        finally:
+            os.chdir(cwd)
+    assert not failures, "\n".join(failures)
+
+if __name__ == "__main__":
+    try:
+        test_matches_glob()
+    except AssertionError as e:
+        print(f"FAIL\n{e}")
+        sys.exit(1)
+    print("PASS: _scan_glob matches glob.glob for all patterns")
@@ -9,20 +9,78 @@ import json
 import sys
 import os
 import asyncio
-from openai import AsyncOpenAI
+import hashlib
+import random
+import time
+from collections import OrderedDict
+import httpx
+from openai import AsyncOpenAI, RateLimitError
+
+# orjson encodes/decodes JSON-RPC lines much faster when available; stdlib json otherwise
+try:
+    import orjson
+    json_loads = orjson.loads
+    
+    def json_line(message):
+        return orjson.dumps(message) + b"\n"
+except ImportError:
+    json_loads = json.loads
+    
+    def json_line(message):
+        return json.dumps(message).encode() + b"\n"
+
+# Largest JSON-RPC line accepted on stdin (chat histories can be long)
+STDIN_LINE_LIMIT = 64 * 1024 * 1024
+
+# Concurrent GPT-5 requests allowed in flight (keeps us under OpenAI rate limits)
+MAX_CONCURRENCY = int(os.environ.get("GPT5_MAX_CONCURRENCY", "8"))
+_SEMAPHORE = asyncio.Semaphore(MAX_CONCURRENCY)
+
+# Attempts for a rate-limited (429) request, with exponential backoff between them
+RATE_LIMIT_ATTEMPTS = 4
+
+# Minimum seconds between progress notifications while a response streams in
+PROGRESS_INTERVAL = 0.5
+
+# Answers to identical message lists are reused for GPT5_CACHE_TTL seconds (0 disables)
+CACHE_TTL = float(os.environ.get("GPT5_CACHE_TTL", "3600"))
+CACHE_MAX_ENTRIES = 1024
+_CACHE = OrderedDict()  # sha256 of messages -> (text, monotonic time stored)
+
+# One client for the life of the process so its HTTP connection pool is reused.
+# SDK retries are off because call_gpt5 does its own retry/backoff.
+_API_KEY = os.environ.get("OPENAI_API_KEY")
+_CLIENT = AsyncOpenAI(
+    api_key=_API_KEY,
+    max_retries=0,
+    http_client=httpx.AsyncClient(
+        timeout=httpx.Timeout(600.0, connect=10.0),
+        limits=httpx.Limits(max_connections=50, max_keepalive_connections=20),
+    ),
+) if _API_KEY else None
+
+# Binary stdout, looked up once; each message goes out as a single write
+_STDOUT = sys.stdout.buffer
 
 def send_message(message):
     """Send a JSON-RPC message to stdout"""
-    print(json.dumps(message))
-    sys.stdout.flush()
+    _STDOUT.write(json_line(message))
+    _STDOUT.flush()
 
-def receive_message():
+async def open_stdin_reader():
+    """Wrap stdin in an asyncio StreamReader so reads don't block the event loop"""
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader(limit=STDIN_LINE_LIMIT)
+    await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+    return reader
+
+async def receive_message(reader):
     """Receive a JSON-RPC message from stdin"""
     try:
-        line = sys.stdin.readline()
+        line = await reader.readline()
         if not line:
             return None
-        return json.loads(line.strip())
+        return json_loads(line)
     except json.JSONDecodeError:
         return None
 
@@ -68,51 +126,119 @@ def handle_tools_list():
         ]
     }
 
+# GPT-5 tokenizer, loaded on first use: tiktoken may download its BPE file,
+# which must not be able to stop the server from starting. False = unavailable.
+_ENCODING = None
+
+def get_encoding():
+    """The o200k_base encoding, or None if tiktoken or its BPE file can't be loaded"""
+    global _ENCODING
+    if _ENCODING is None:
+        try:
+            import tiktoken
+            _ENCODING = tiktoken.get_encoding("o200k_base")
+        except Exception as e:
+            print(f"[gpt5-proxy] tiktoken unavailable ({e}); estimating 4 chars per token", file=sys.stderr)
+            _ENCODING = False
+    return _ENCODING or None
+
 def estimate_prompt_tokens(messages):
-    """Rough estimation of prompt tokens (4 chars ≈ 1 token)"""
-    total_chars = sum(len(str(msg.get('content', ''))) for msg in messages)
-    return total_chars // 4
+    """Count prompt tokens with the GPT-5 tokenizer (falls back to 4 chars ≈ 1 token)"""
+    encoding = get_encoding()
+    if encoding is None:
+        total_chars = sum(len(str(msg.get('content', ''))) for msg in messages)
+        return total_chars // 4
+    
+    # +4 per message approximates role/formatting overhead
+    return sum(
+        len(encoding.encode(str(msg.get('content', '')), disallowed_special=())) + 4
+        for msg in messages
+    )
+
+# GPT-5 token limits (total context window, and the most it will generate)
+CONTEXT_LIMIT = 400000
+MAX_OUTPUT_TOKENS = 128000
 
 def calc_max_tokens(messages):
-    """Calculate safe max_completion_tokens based on prompt length"""
-    # Get configurable limit from environment
-    env_limit = int(os.environ.get("GPT5_MAX_COMPLETION_TOKENS", "4096"))
-    
-    # GPT-5 has large context window (conservative estimate)
-    context_limit = 128000  # 128k tokens
-    
+    """Calculate safe max_output_tokens based on prompt length"""
     # Estimate prompt tokens and calculate remaining room
     prompt_tokens = estimate_prompt_tokens(messages)
-    available_room = max(context_limit - prompt_tokens - 100, 64)  # 100 token safety buffer
+    available_room = max(min(CONTEXT_LIMIT - prompt_tokens - 100, MAX_OUTPUT_TOKENS), 64)  # 100 token safety buffer
     
-    # Use the smaller of env limit or available room
-    return min(env_limit, available_room)
+    # Trust the context window unless the operator pinned a lower cap
+    env_limit = os.environ.get("GPT5_MAX_COMPLETION_TOKENS", "").strip()
+    if env_limit.isdigit():
+        return min(int(env_limit), available_room)
+    return available_room
+
+def cache_key(messages):
+    """Content-addressed key for a messages list"""
+    return hashlib.sha256(json.dumps(messages, sort_keys=True).encode()).hexdigest()
+
+def cache_get(key):
+    """Return a cached answer if present and not expired"""
+    entry = _CACHE.get(key)
+    if entry is None:
+        return None
+    text, stored_at = entry
+    if time.monotonic() - stored_at >= CACHE_TTL:
+        del _CACHE[key]
+        return None
+    _CACHE.move_to_end(key)
+    return text
+
+def cache_put(key, text):
+    """Store an answer, evicting the least recently used beyond CACHE_MAX_ENTRIES"""
+    _CACHE[key] = (text, time.monotonic())
+    _CACHE.move_to_end(key)
+    while len(_CACHE) > CACHE_MAX_ENTRIES:
+        _CACHE.popitem(last=False)
 
-async def call_gpt5(messages):
-    """Call OpenAI GPT-5 model using the Responses API"""
-    api_key = os.environ.get("OPENAI_API_KEY")
-    if not api_key:
+async def call_gpt5(messages, on_delta=None):
+    """Call OpenAI GPT-5 model using the streaming Responses API
+    
+    on_delta, if given, is called with each chunk of output text as it arrives.
+    """
+    if _CLIENT is None:
         raise ValueError("OPENAI_API_KEY environment variable is not set")
     
-    client = AsyncOpenAI(api_key=api_key)
+    client = _CLIENT
+    
+    key = cache_key(messages) if CACHE_TTL > 0 else None
+    if key is not None:
+        cached = cache_get(key)
+        if cached is not None:
+            print("[gpt5-proxy] Returning cached response", file=sys.stderr)
+            return cached
     
     max_tokens = calc_max_tokens(messages)
     
-    # Try up to 2 attempts (original + 1 retry)
-    for attempt in range(2):
+    # GPT-5 uses the Responses API, not Chat Completions
+    # Convert messages to input format
+    input_text = "\n".join([f"{msg['role']}: {msg['content']}" for msg in messages])
+    
+    # Try up to 2 attempts on API errors (original + 1 retry); rate limits get more with backoff
+    for attempt in range(RATE_LIMIT_ATTEMPTS):
         try:
             # Try GPT-5 only - no fallback to mini version
             try:
-                # GPT-5 uses the Responses API, not Chat Completions
-                # Convert messages to input format
-                input_text = "\n".join([f"{msg['role']}: {msg['content']}" for msg in messages])
-                
-                response = await client.responses.create(
-                    model="gpt-5",
-                    input=input_text,
-                    reasoning={"effort": "high"},
-                    text={"verbosity": "high"}
-                )
+                chunks = []
+                async with _SEMAPHORE:
+                    async with client.responses.stream(
+                        model="gpt-5",
+                        input=input_text,
+                        reasoning={"effort": "high"},
+                        text={"verbosity": "high"},
+                        max_output_tokens=max_tokens
+                    ) as stream:
+                        async for event in stream:
+                            if event.type == "response.output_text.delta":
+                                chunks.append(event.delta)
+                                if on_delta is not None:
+                                    on_delta(event.delta)
+                        final = await stream.get_final_response()
+            except RateLimitError:
+                raise
             except Exception as e:
                 if "Unsupported model" in str(e) or "model_not_found" in str(e) or "invalid_request_error" in str(e):
                     error_msg = (
@@ -125,30 +251,19 @@ async def call_gpt5(messages):
                 else:
                     raise e
             
-            # Responses API returns output_text directly
-            if hasattr(response, 'output_text'):
-                return response.output_text
-            else:
-                return str(response)  # Fallback
-            
-            # Response was truncated - try to increase token limit for retry
-            if attempt == 0:  # Only retry once
-                # Double the token limit for retry, but respect context window
-                context_limit = 128000
-                prompt_tokens = estimate_prompt_tokens(messages)
-                max_possible = max(context_limit - prompt_tokens - 100, 64)
-                
-                if max_possible > max_tokens:
-                    max_tokens = min(max_possible, max_tokens * 2)
-                    print(f"[gpt5-proxy] Response truncated, retrying with {max_tokens} tokens", file=sys.stderr)
-                    continue
-            
-            # Could not increase tokens further, return truncated response with warning
-            print(f"[gpt5-proxy] WARNING: Response may be truncated at {max_tokens} tokens", file=sys.stderr)
-            if hasattr(response, 'output_text'):
-                return response.output_text
-            return str(response)
+            text = "".join(chunks)
+            # Empty or truncated (status "incomplete") answers are returned but never cached
+            if key is not None and text and getattr(final, "status", None) == "completed":
+                cache_put(key, text)
+            return text
             
+        except RateLimitError as e:
+            if attempt < RATE_LIMIT_ATTEMPTS - 1:
+                delay = 2 ** attempt + random.random()
+                print(f"[gpt5-proxy] Rate limited, retrying in {delay:.1f}s", file=sys.stderr)
+                await asyncio.sleep(delay)
+                continue
+            raise ValueError(f"Failed to call GPT-5: {str(e)}")
         except Exception as e:
             if attempt == 0:
                 # Retry once on any error
@@ -158,7 +273,29 @@ async def call_gpt5(messages):
     # Should not reach here, but just in case
     raise ValueError("GPT-5 call failed after retries")
 
-def handle_tools_call(name, arguments):
+def progress_reporter(progress_token):
+    """Build an on_delta callback that sends MCP progress notifications (characters received so far)"""
+    received = 0
+    last_sent = 0.0
+    
+    def on_delta(delta):
+        nonlocal received, last_sent
+        received += len(delta)
+        now = time.monotonic()
+        if now - last_sent >= PROGRESS_INTERVAL:
+            last_sent = now
+            send_message({
+                "jsonrpc": "2.0",
+                "method": "notifications/progress",
+                "params": {
+                    "progressToken": progress_token,
+                    "progress": received
+                }
+            })
+    
+    return on_delta
+
+async def handle_tools_call(name, arguments, progress_token=None):
     """Handle tools/call request"""
     if name != "gpt5_chat":
         raise ValueError(f"Unknown tool: {name}")
@@ -167,14 +304,9 @@ def handle_tools_call(name, arguments):
     if not messages:
         raise ValueError("messages parameter is required")
     
-    # Run the async function in sync context
     try:
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        try:
-            content = loop.run_until_complete(call_gpt5(messages))
-        finally:
-            loop.close()
+        on_delta = progress_reporter(progress_token) if progress_token is not None else None
+        content = await call_gpt5(messages, on_delta)
         
         return {
             "content": [
@@ -188,54 +320,77 @@ def handle_tools_call(name, arguments):
     except Exception as e:
         raise ValueError(f"GPT-5 consultation failed: {str(e)}")
 
-def main():
+async def handle_request(request):
+    """Dispatch one JSON-RPC request and send its response"""
+    method = request.get("method")
+    params = request.get("params", {})
+    request_id = request.get("id")
+    
+    try:
+        if method == "initialize":
+            result = handle_initialize(params)
+        elif method == "tools/list":
+            result = handle_tools_list()
+        elif method == "tools/call":
+            tool_name = params.get("name")
+            arguments = params.get("arguments", {})
+            progress_token = params.get("_meta", {}).get("progressToken")
+            result = await handle_tools_call(tool_name, arguments, progress_token)
+        else:
+            raise ValueError(f"Unknown method: {method}")
+        
+        # Send success response
+        response = {
+            "jsonrpc": "2.0",
+            "id": request_id,
+            "result": result
+        }
+        send_message(response)
+        
+    except Exception as e:
+        # Send error response
+        error_response = {
+            "jsonrpc": "2.0",
+            "id": request_id,
+            "error": {
+                "code": -32603,
+                "message": str(e)
+            }
+        }
+        send_message(error_response)
+
+async def main_async():
     """Main MCP server loop"""
+    if _CLIENT is None:
+        print("[gpt5-proxy] WARNING: OPENAI_API_KEY is not set; gpt5_chat calls will fail", file=sys.stderr)
+    
+    reader = await open_stdin_reader()
+    
+    # Each request runs as its own task so slow GPT-5 calls overlap; responses
+    # may go out of order since each carries its request id
+    pending = set()
     while True:
         try:
-            request = receive_message()
+            request = await receive_message(reader)
             if request is None:
                 break
-            
-            method = request.get("method")
-            params = request.get("params", {})
-            request_id = request.get("id")
-            
-            try:
-                if method == "initialize":
-                    result = handle_initialize(params)
-                elif method == "tools/list":
-                    result = handle_tools_list()
-                elif method == "tools/call":
-                    tool_name = params.get("name")
-                    arguments = params.get("arguments", {})
-                    result = handle_tools_call(tool_name, arguments)
-                else:
-                    raise ValueError(f"Unknown method: {method}")
-                
-                # Send success response
-                response = {
-                    "jsonrpc": "2.0",
-                    "id": request_id,
-                    "result": result
-                }
-                send_message(response)
-                
-            except Exception as e:
-                # Send error response
-                error_response = {
-                    "jsonrpc": "2.0",
-                    "id": request_id,
-                    "error": {
-                        "code": -32603,
-                        "message": str(e)
-                    }
-                }
-                send_message(error_response)
-                
-        except KeyboardInterrupt:
-            break
         except Exception:
             break
+        
+        task = asyncio.create_task(handle_request(request))
+        pending.add(task)
+        task.add_done_callback(pending.discard)
+    
+    # Let in-flight calls finish and answer before exiting
+    if pending:
+        await asyncio.gather(*pending, return_exceptions=True)
+
+def main():
+    """Run the server on a single event loop for the life of the process"""
+    try:
+        asyncio.run(main_async())
+    except KeyboardInterrupt:
+        pass
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
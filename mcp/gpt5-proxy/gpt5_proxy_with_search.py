@@ -9,22 +9,87 @@ import json
 import sys
 import os
 import asyncio
+import hashlib
+import importlib.util
+from collections import OrderedDict
+from pathlib import Path
+import httpx
 from openai import AsyncOpenAI
-import requests
 from urllib.parse import quote
 
+# orjson encodes/decodes JSON much faster when available; stdlib json otherwise
+try:
+    import orjson
+    json_loads = orjson.loads
+    json_dumps = orjson.dumps
+except ImportError:
+    json_loads = json.loads
+
+    def json_dumps(obj):
+        return json.dumps(obj).encode()
+
+# Shared response cache lives one level up, next to the other MCP servers
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from llm_cache import REQUEST_INFORMATIONAL, SemanticCache, cache_key, classify_request, coalesce
+
+_CACHE = SemanticCache()
+
+# tools/call requests allowed to run at once; the rest wait their turn
+MAX_CONCURRENCY = int(os.environ.get("MCP_MAX_CONCURRENCY", "4"))
+_SEMAPHORE = asyncio.Semaphore(MAX_CONCURRENCY)
+
+# Largest JSON-RPC line accepted on stdin (chat histories can be long)
+STDIN_LINE_LIMIT = 64 * 1024 * 1024
+
+# One client for the life of the process so its HTTP connection pool is reused.
+# SDK retries are off because call_gpt5 does its own retry.
+_API_KEY = os.environ.get("OPENAI_API_KEY")
+_CLIENT = AsyncOpenAI(
+    api_key=_API_KEY,
+    max_retries=0,
+    http_client=httpx.AsyncClient(
+        timeout=httpx.Timeout(300.0, connect=10.0),
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+    ),
+) if _API_KEY else None
+
+# GPT5_SPECULATIVE=1 starts GPT-5 on the bare query while the search runs; the
+# speculative answer is used only if the search takes longer than the deadline
+SPECULATIVE = os.environ.get("GPT5_SPECULATIVE", "") == "1"
+SPECULATIVE_SEARCH_DEADLINE = float(os.environ.get("GPT5_SPECULATIVE_DEADLINE", "3"))
+
+# Pooled client for the Brave / DuckDuckGo search APIs. HTTP/2 (when the
+# optional h2 package is installed) multiplexes concurrent searches over one
+# connection per host.
+_SEARCH_CLIENT = httpx.AsyncClient(
+    http2=importlib.util.find_spec("h2") is not None,
+    timeout=10.0,
+    limits=httpx.Limits(max_connections=50, max_keepalive_connections=10),
+    headers={"Accept": "application/json"},
+)
+
+# Binary stdout, looked up once; each message goes out as a single write
+_STDOUT = sys.stdout.buffer
+
 def send_message(message):
     """Send a JSON-RPC message to stdout"""
-    print(json.dumps(message))
-    sys.stdout.flush()
+    _STDOUT.write(json_dumps(message) + b"\n")
+    _STDOUT.flush()
+
+async def open_stdin_reader():
+    """Wrap stdin in an asyncio StreamReader so reads don't block the event loop"""
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader(limit=STDIN_LINE_LIMIT)
+    await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+    return reader
 
-def receive_message():
+async def receive_message(reader):
     """Receive a JSON-RPC message from stdin"""
     try:
-        line = sys.stdin.readline()
+        line = await reader.readline()
         if not line:
             return None
-        return json.loads(line.strip())
+        return json_loads(line)
     except json.JSONDecodeError:
         return None
 
@@ -88,23 +153,20 @@ def handle_tools_list():
         ]
     }
 
-def search_web(query):
+async def search_web(query):
     """Search the web using Brave Search API"""
     api_key = os.environ.get("BRAVE_SEARCH_API_KEY")
     if not api_key:
         # Fallback to DuckDuckGo HTML search if no Brave API key
-        return search_duckduckgo(query)
+        return await search_duckduckgo(query)
     
     url = f"https://api.search.brave.com/res/v1/web/search?q={quote(query)}"
-    headers = {
-        "Accept": "application/json",
-        "X-Subscription-Token": api_key
-    }
+    headers = {"X-Subscription-Token": api_key}
     
     try:
-        response = requests.get(url, headers=headers, timeout=10)
+        response = await _SEARCH_CLIENT.get(url, headers=headers)
         response.raise_for_status()
-        data = response.json()
+        data = json_loads(response.content)
         
         results = []
         for item in data.get("web", {}).get("results", [])[:5]:  # Top 5 results
@@ -116,16 +178,16 @@ def search_web(query):
         return results
     except Exception as e:
         print(f"[gpt5-proxy] Brave search failed: {e}, falling back to DuckDuckGo", file=sys.stderr)
-        return search_duckduckgo(query)
+        return await search_duckduckgo(query)
 
-def search_duckduckgo(query):
+async def search_duckduckgo(query):
     """Fallback search using DuckDuckGo instant answer API"""
     url = f"https://api.duckduckgo.com/?q={quote(query)}&format=json&no_html=1"
     
     try:
-        response = requests.get(url, timeout=10)
+        response = await _SEARCH_CLIENT.get(url)
         response.raise_for_status()
-        data = response.json()
+        data = json_loads(response.content)
         
         results = []
         
@@ -162,51 +224,108 @@ def search_duckduckgo(query):
             "description": f"Could not search for '{query}'. Error: {str(e)}"
         }]
 
+# GPT-5 tokenizer, loaded on first use: tiktoken may download its BPE file,
+# which must not be able to stop the server from starting. False = unavailable.
+_ENCODING = None
+
+def get_encoding():
+    """The o200k_base encoding, or None if tiktoken or its BPE file can't be loaded"""
+    global _ENCODING
+    if _ENCODING is None:
+        try:
+            import tiktoken
+            _ENCODING = tiktoken.get_encoding("o200k_base")
+        except Exception as e:
+            print(f"[gpt5-proxy] tiktoken unavailable ({e}); estimating 4 chars per token", file=sys.stderr)
+            _ENCODING = False
+    return _ENCODING or None
+
+# Token counts of recently seen texts, keyed by SHA-256 digest so the memo
+# doesn't hold the (possibly huge) texts themselves
+TOKEN_COUNT_CACHE_SIZE = 1024
+_TOKEN_COUNTS = OrderedDict()
+
+def count_tokens(encoding, text):
+    """Token count of one piece of text, memoized so retries and repeated messages encode once"""
+    key = hashlib.sha256(text.encode("utf-8", "surrogatepass")).digest()
+    count = _TOKEN_COUNTS.get(key)
+    if count is None:
+        count = len(encoding.encode(text, disallowed_special=()))
+        _TOKEN_COUNTS[key] = count
+        if len(_TOKEN_COUNTS) > TOKEN_COUNT_CACHE_SIZE:
+            _TOKEN_COUNTS.popitem(last=False)
+    else:
+        _TOKEN_COUNTS.move_to_end(key)
+    return count
+
 def estimate_prompt_tokens(messages):
-    """Rough estimation of prompt tokens (4 chars ≈ 1 token)"""
-    if isinstance(messages, str):
-        return len(messages) // 4
-    total_chars = sum(len(str(msg.get('content', ''))) for msg in messages)
-    return total_chars // 4
+    """Count prompt tokens with the GPT-5 tokenizer (falls back to 4 chars ≈ 1 token)"""
+    encoding = get_encoding()
+    if encoding is None:
+        total_chars = sum(len(str(msg.get('content', ''))) for msg in messages)
+        return total_chars // 4
+
+    # +4 per message approximates role/formatting overhead
+    return sum(count_tokens(encoding, str(msg.get('content', ''))) + 4 for msg in messages)
+
+# GPT-5 token limits (total context window, and the most it will generate)
+CONTEXT_LIMIT = 400000
+MAX_OUTPUT_TOKENS = 128000
 
 def calc_max_tokens(messages):
-    """Calculate safe max_completion_tokens based on prompt length"""
-    env_limit = int(os.environ.get("GPT5_MAX_COMPLETION_TOKENS", "4096"))
-    context_limit = 128000  # 128k tokens
-    
+    """Calculate safe max_output_tokens based on prompt length"""
+    # Estimate prompt tokens and calculate remaining room
     prompt_tokens = estimate_prompt_tokens(messages)
-    available_room = max(context_limit - prompt_tokens - 100, 64)
+    available_room = max(min(CONTEXT_LIMIT - prompt_tokens - 100, MAX_OUTPUT_TOKENS), 64)  # 100 token safety buffer
     
-    return min(env_limit, available_room)
+    # Trust the context window unless the operator pinned a lower cap
+    env_limit = os.environ.get("GPT5_MAX_COMPLETION_TOKENS", "").strip()
+    if env_limit.isdigit():
+        return min(int(env_limit), available_room)
+    return available_room
 
-async def call_gpt5(messages):
-    """Call OpenAI GPT-5 model using the Responses API"""
-    api_key = os.environ.get("OPENAI_API_KEY")
-    if not api_key:
+async def call_gpt5(messages, namespace="gpt5_chat", request_type=None):
+    """Call GPT-5; identical concurrent requests share a single upstream call"""
+    return await coalesce(
+        cache_key(namespace, "gpt-5", messages),
+        lambda: _call_gpt5(messages, namespace, request_type),
+    )
+
+async def _call_gpt5(messages, namespace, request_type):
+    """Call OpenAI GPT-5 model using the Responses API, answering from the semantic cache when possible"""
+    if _CLIENT is None:
         raise ValueError("OPENAI_API_KEY environment variable is not set")
     
-    client = AsyncOpenAI(api_key=api_key)
+    request_type = request_type or classify_request(messages)
+    print(f"[gpt5-proxy] {namespace} request_type={request_type}", file=sys.stderr)
+    cached, cache_token = await _CACHE.get(namespace, messages, "gpt-5", request_type)
+    if cached is not None:
+        print(f"[gpt5-proxy] Returning cached response ({namespace})", file=sys.stderr)
+        return cached
+    
+    client = _CLIENT
     max_tokens = calc_max_tokens(messages)
     
+    # The Responses API takes role-tagged messages directly
+    input_messages = [{"role": msg["role"], "content": msg["content"]} for msg in messages]
+
     for attempt in range(2):
         try:
-            # Convert messages to input format
-            if isinstance(messages, str):
-                input_text = messages
-            else:
-                input_text = "\n".join([f"{msg['role']}: {msg['content']}" for msg in messages])
-            
             response = await client.responses.create(
                 model="gpt-5",
-                input=input_text,
+                input=input_messages,
                 reasoning={"effort": "high"},
-                text={"verbosity": "high"}
+                text={"verbosity": "high"},
+                max_output_tokens=max_tokens
             )
             
             if hasattr(response, 'output_text'):
-                return response.output_text
+                text = response.output_text
             else:
-                return str(response)
+                text = str(response)
+            
+            await _CACHE.put(namespace, cache_token, text)
+            return text
             
         except Exception as e:
             if "Unsupported model" in str(e) or "model_not_found" in str(e):
@@ -219,7 +338,45 @@ async def call_gpt5(messages):
     
     raise ValueError("GPT-5 call failed after retries")
 
-def handle_tools_call(name, arguments):
+async def search_web_cached(query):
+    """search_web, reusing results stored for a semantically similar earlier query"""
+    results, token = await _CACHE.get_search(query)
+    if results is not None:
+        print(f"[gpt5-proxy] Reusing cached search results for: {query}", file=sys.stderr)
+        return results
+
+    results = await search_web(query)
+    # Failure / no-result placeholders carry no URL and are not worth keeping
+    if any(result["url"] for result in results):
+        await _CACHE.put_search(token, results)
+    return results
+
+def build_analysis_messages(query, task, search_results):
+    """System + user messages asking GPT-5 to carry out task over the search results"""
+    results = [
+        f"{i}. {result['title']}\n   URL: {result['url']}\n   {result['description']}"
+        for i, result in enumerate(search_results, 1)
+    ]
+    return [
+        {"role": "system", "content": "You analyze web search results and provide a comprehensive analysis addressing the user's task."},
+        {"role": "user", "content": "\n\n".join([f"Task: {task}", f"Web search results for '{query}':", *results])},
+    ]
+
+async def speculative_search_and_analyze(query, task):
+    """Start a results-free GPT-5 call alongside the search; use it only if the search is slow"""
+    search_task = asyncio.create_task(search_web_cached(query))
+    spec_task = asyncio.create_task(call_gpt5([{"role": "user", "content": f"{task}\n\nQuery: {query}"}], namespace="gpt5_search_speculative", request_type=REQUEST_INFORMATIONAL))
+
+    done, _ = await asyncio.wait({search_task}, timeout=SPECULATIVE_SEARCH_DEADLINE)
+    if done:
+        spec_task.cancel()
+        return await call_gpt5(build_analysis_messages(query, task, search_task.result()), namespace="gpt5_search_and_analyze", request_type=REQUEST_INFORMATIONAL)
+
+    print(f"[gpt5-proxy] Search still running after {SPECULATIVE_SEARCH_DEADLINE}s, using speculative answer", file=sys.stderr)
+    search_task.cancel()
+    return await spec_task
+
+async def handle_tools_call(name, arguments):
     """Handle tools/call request"""
     if name == "gpt5_chat":
         messages = arguments.get("messages", [])
@@ -227,12 +384,7 @@ def handle_tools_call(name, arguments):
             raise ValueError("messages parameter is required")
         
         try:
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            try:
-                content = loop.run_until_complete(call_gpt5(messages))
-            finally:
-                loop.close()
+            content = await call_gpt5(messages)
             
             return {
                 "content": [
@@ -252,31 +404,13 @@ def handle_tools_call(name, arguments):
         if not query or not task:
             raise ValueError("Both 'query' and 'task' parameters are required")
         
-        # Search the web
         print(f"[gpt5-proxy] Searching for: {query}", file=sys.stderr)
-        search_results = search_web(query)
-        
-        # Format search results for GPT-5
-        search_context = f"Web search results for '{query}':\n\n"
-        for i, result in enumerate(search_results, 1):
-            search_context += f"{i}. {result['title']}\n"
-            search_context += f"   URL: {result['url']}\n"
-            search_context += f"   {result['description']}\n\n"
-        
-        # Create prompt for GPT-5
-        analysis_prompt = f"""Based on these web search results, {task}
-
-{search_context}
-
-Please provide a comprehensive analysis addressing the task."""
-        
         try:
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            try:
-                content = loop.run_until_complete(call_gpt5(analysis_prompt))
-            finally:
-                loop.close()
+            if SPECULATIVE:
+                content = await speculative_search_and_analyze(query, task)
+            else:
+                search_results = await search_web_cached(query)
+                content = await call_gpt5(build_analysis_messages(query, task, search_results), namespace="gpt5_search_and_analyze", request_type=REQUEST_INFORMATIONAL)
             
             return {
                 "content": [
@@ -292,52 +426,74 @@ Please provide a comprehensive analysis addressing the task."""
     else:
         raise ValueError(f"Unknown tool: {name}")
 
-def main():
+async def handle_request(request):
+    """Dispatch one JSON-RPC request and send its response"""
+    method = request.get("method")
+    params = request.get("params", {})
+    request_id = request.get("id")
+    
+    try:
+        if method == "initialize":
+            result = handle_initialize(params)
+        elif method == "tools/list":
+            result = handle_tools_list()
+        elif method == "tools/call":
+            tool_name = params.get("name")
+            arguments = params.get("arguments", {})
+            async with _SEMAPHORE:
+                result = await handle_tools_call(tool_name, arguments)
+        else:
+            raise ValueError(f"Unknown method: {method}")
+        
+        response = {
+            "jsonrpc": "2.0",
+            "id": request_id,
+            "result": result
+        }
+        send_message(response)
+        
+    except Exception as e:
+        error_response = {
+            "jsonrpc": "2.0",
+            "id": request_id,
+            "error": {
+                "code": -32603,
+                "message": str(e)
+            }
+        }
+        send_message(error_response)
+
+async def main_async():
     """Main MCP server loop"""
+    reader = await open_stdin_reader()
+    
+    # Each request runs as its own task so slow upstream calls overlap; responses
+    # may go out of order since each carries its request id
+    pending = set()
     while True:
         try:
-            request = receive_message()
+            request = await receive_message(reader)
             if request is None:
                 break
-            
-            method = request.get("method")
-            params = request.get("params", {})
-            request_id = request.get("id")
-            
-            try:
-                if method == "initialize":
-                    result = handle_initialize(params)
-                elif method == "tools/list":
-                    result = handle_tools_list()
-                elif method == "tools/call":
-                    tool_name = params.get("name")
-                    arguments = params.get("arguments", {})
-                    result = handle_tools_call(tool_name, arguments)
-                else:
-                    raise ValueError(f"Unknown method: {method}")
-                
-                response = {
-                    "jsonrpc": "2.0",
-                    "id": request_id,
-                    "result": result
-                }
-                send_message(response)
-                
-            except Exception as e:
-                error_response = {
-                    "jsonrpc": "2.0",
-                    "id": request_id,
-                    "error": {
-                        "code": -32603,
-                        "message": str(e)
-                    }
-                }
-                send_message(error_response)
-                
-        except KeyboardInterrupt:
-            break
         except Exception:
             break
+        
+        task = asyncio.create_task(handle_request(request))
+        pending.add(task)
+        task.add_done_callback(pending.discard)
+    
+    # Let in-flight calls finish and answer before exiting
+    if pending:
+        await asyncio.gather(*pending, return_exceptions=True)
+    
+    await _SEARCH_CLIENT.aclose()
+
+def main():
+    """Run the server on a single event loop for the life of the process"""
+    try:
+        asyncio.run(main_async())
+    except KeyboardInterrupt:
+        pass
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,9 +1,19 @@
 # save as mcp_gpt5_proxy.py  (pip install fastmcp==2.* openai==1.* uvicorn)
 import os, asyncio, openai
+import httpx
 from fastmcp import FastMCP
 
 openai.api_key = os.environ["OPENAI_API_KEY"]
 
+# One client for the life of the server so its HTTP connection pool is reused;
+# concurrent tool calls share up to 20 kept-alive connections
+_client = openai.AsyncOpenAI(
+    http_client=httpx.AsyncClient(
+        timeout=httpx.Timeout(300.0, connect=10.0),
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+    )
+)
+
 server = FastMCP(name="gpt5_proxy")
 
 @server.tool()
@@ -12,7 +22,7 @@ async def gpt5_chat(messages: list[dict]) -> str:
     try:
         # GPT-5 uses the Responses API
         input_text = "\n".join([f"{msg['role']}: {msg['content']}" for msg in messages])
-        response = await openai.AsyncOpenAI().responses.create(
+        response = await _client.responses.create(
             model="gpt-5",
             input=input_text,
             reasoning={"effort": "medium"},
@@ -11,9 +11,26 @@ import os
 import asyncio
 import aiohttp
 import logging
+import time
 from datetime import datetime
+from pathlib import Path
 from typing import Optional, Dict, Any
 
+# orjson encodes/decodes JSON much faster when available; stdlib json otherwise
+try:
+    import orjson
+    json_loads = orjson.loads
+    json_dumps = orjson.dumps
+except ImportError:
+    json_loads = json.loads
+
+    def json_dumps(obj):
+        return json.dumps(obj).encode()
+
+# Shared response cache lives one level up, next to the other MCP servers
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from llm_cache import SemanticCache, cache_key, classify_request, coalesce
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -26,33 +43,48 @@ logging.basicConfig(
 logger = logging.getLogger('grok-proxy')
 
 class CircuitBreaker:
-    """Simple circuit breaker for API calls"""
+    """Simple circuit breaker for API calls
+
+    Uses the monotonic clock so wall-clock jumps can't open or close it early.
+    While half-open only one trial call is let through; concurrent requests are
+    refused until that call records a result (or a further timeout passes).
+    """
     def __init__(self, failure_threshold: int = 3, timeout: int = 60):
         self.failure_threshold = failure_threshold
         self.timeout = timeout
         self.failure_count = 0
         self.last_failure_time = None
+        self.probe_started = None
         self.state = "closed"  # closed, open, half-open
 
     def can_execute(self) -> bool:
         if self.state == "closed":
             return True
-        elif self.state == "open":
-            if datetime.now().timestamp() - self.last_failure_time > self.timeout:
+
+        now = time.monotonic()
+        if self.state == "open":
+            if now - self.last_failure_time > self.timeout:
                 self.state = "half-open"
+                self.probe_started = now
                 return True
             return False
         else:  # half-open
-            return True
+            if self.probe_started is None or now - self.probe_started > self.timeout:
+                self.probe_started = now
+                return True
+            return False
 
     def record_success(self):
+        if self.state != "closed":
+            logger.info("Circuit breaker reset - service healthy")
         self.failure_count = 0
+        self.probe_started = None
         self.state = "closed"
-        logger.info("Circuit breaker reset - service healthy")
 
     def record_failure(self):
         self.failure_count += 1
-        self.last_failure_time = datetime.now().timestamp()
+        self.last_failure_time = time.monotonic()
+        self.probe_started = None
         if self.failure_count >= self.failure_threshold:
             self.state = "open"
             logger.error(f"Circuit breaker opened after {self.failure_count} failures")
@@ -60,18 +92,59 @@ class CircuitBreaker:
 # Global circuit breaker instance
 circuit_breaker = CircuitBreaker()
 
+# Semantic cache for grok_chat answers
+_CACHE = SemanticCache()
+
+# Shared HTTP session (keep-alive + connection pooling to api.x.ai), created on first use
+_session: Optional[aiohttp.ClientSession] = None
+
+async def _get_session() -> aiohttp.ClientSession:
+    """Return the shared aiohttp session, creating it on the running loop if needed"""
+    global _session
+    if _session is None or _session.closed:
+        _session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=100, limit_per_host=20, keepalive_timeout=75, ttl_dns_cache=300),
+            timeout=aiohttp.ClientTimeout(total=300)
+        )
+    return _session
+
+# tools/call requests allowed to run at once; the rest wait their turn
+MAX_CONCURRENCY = int(os.environ.get("MCP_MAX_CONCURRENCY", "4"))
+_SEMAPHORE = asyncio.Semaphore(MAX_CONCURRENCY)
+
+# Attached files read at once for grok_chat (keeps us clear of the fd limit)
+FILE_READ_CONCURRENCY = 16
+_FILE_SEMAPHORE = asyncio.Semaphore(FILE_READ_CONCURRENCY)
+
+# Longest silence tolerated mid-stream; there is no overall cap since long
+# reasoning responses keep streaming for minutes
+STREAM_READ_TIMEOUT = 60
+
+# Largest JSON-RPC line accepted on stdin (chat histories can be long)
+STDIN_LINE_LIMIT = 64 * 1024 * 1024
+
+# Binary stdout, looked up once; each message goes out as a single write
+_STDOUT = sys.stdout.buffer
+
 def send_message(message):
     """Send a JSON-RPC message to stdout"""
-    print(json.dumps(message))
-    sys.stdout.flush()
+    _STDOUT.write(json_dumps(message) + b"\n")
+    _STDOUT.flush()
 
-def receive_message():
+async def open_stdin_reader():
+    """Wrap stdin in an asyncio StreamReader so reads don't block the event loop"""
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader(limit=STDIN_LINE_LIMIT)
+    await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+    return reader
+
+async def receive_message(reader):
     """Receive a JSON-RPC message from stdin"""
     try:
-        line = sys.stdin.readline()
+        line = await reader.readline()
         if not line:
             return None
-        return json.loads(line.strip())
+        return json_loads(line)
     except json.JSONDecodeError:
         return None
 
@@ -98,7 +171,7 @@ def handle_tools_list():
                 "inputSchema": {
                     "type": "object",
                     "properties": {},
-                    "additionalProperties": false
+                    "additionalProperties": False
                 }
             },
             {
@@ -169,24 +242,24 @@ async def check_api_health() -> Dict[str, Any]:
 
     start_time = datetime.now()
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
-                "https://api.x.ai/v1/chat/completions",
-                headers=headers,
-                json=test_data,
-                timeout=aiohttp.ClientTimeout(total=10)
-            ) as response:
-                response_time = (datetime.now() - start_time).total_seconds() * 1000
-                health_status["response_time_ms"] = round(response_time, 2)
-
-                if response.status == 200:
-                    health_status["status"] = "healthy"
-                    health_status["api_connectivity"] = True
-                    circuit_breaker.record_success()
-                else:
-                    health_status["status"] = "unhealthy"
-                    health_status["error"] = f"API returned status {response.status}"
-                    circuit_breaker.record_failure()
+        session = await _get_session()
+        async with session.post(
+            "https://api.x.ai/v1/chat/completions",
+            headers=headers,
+            json=test_data,
+            timeout=aiohttp.ClientTimeout(total=10)
+        ) as response:
+            response_time = (datetime.now() - start_time).total_seconds() * 1000
+            health_status["response_time_ms"] = round(response_time, 2)
+
+            if response.status == 200:
+                health_status["status"] = "healthy"
+                health_status["api_connectivity"] = True
+                circuit_breaker.record_success()
+            else:
+                health_status["status"] = "unhealthy"
+                health_status["error"] = f"API returned status {response.status}"
+                circuit_breaker.record_failure()
 
     except asyncio.TimeoutError:
         health_status["status"] = "unhealthy"
@@ -200,17 +273,55 @@ async def check_api_health() -> Dict[str, Any]:
     logger.info(f"Health check result: {health_status['status']}")
     return health_status
 
+async def read_completion(response):
+    """Return (content, reasoning, usage) from a streamed (SSE) or plain JSON completion"""
+    if response.content_type != "text/event-stream":
+        result = json_loads(await response.read())
+        message = result["choices"][0]["message"]
+        return message["content"], message.get("reasoning_content", ""), result.get("usage")
+
+    content, reasoning, usage = [], [], None
+    async for line in response.content:
+        if not line.startswith(b"data:"):
+            continue
+        payload = line[5:].strip()
+        if payload == b"[DONE]":
+            break
+        chunk = json_loads(payload)
+        if chunk.get("usage"):
+            usage = chunk["usage"]
+        for choice in chunk.get("choices", []):
+            delta = choice.get("delta", {})
+            if delta.get("content"):
+                content.append(delta["content"])
+            if delta.get("reasoning_content"):
+                reasoning.append(delta["reasoning_content"])
+    return "".join(content), "".join(reasoning), usage
+
 async def call_grok_api(messages):
+    """Call Grok-4; identical concurrent requests share a single upstream call"""
+    return await coalesce(cache_key("grok_chat", "grok-4", messages), lambda: _call_grok_api(messages))
+
+async def _call_grok_api(messages):
     """Call X.AI's Grok-4 API with the provided messages"""
+    api_key = os.getenv("XAI_API_KEY")
+    if not api_key:
+        raise ValueError("XAI_API_KEY environment variable is required")
+
+    request_type = classify_request(messages)
+    logger.info(f"grok_chat request_type={request_type}")
+    cached, cache_token = await _CACHE.get("grok_chat", messages, "grok-4", request_type)
+    if cached is not None:
+        logger.info("Returning cached response")
+        return cached
+
+    # Checked only once an upstream call is certain, so a half-open trial slot
+    # is never spent on a cache hit
     if not circuit_breaker.can_execute():
         error_msg = f"Circuit breaker is {circuit_breaker.state} - service temporarily unavailable"
         logger.warning(error_msg)
         return f"Service temporarily unavailable: {error_msg}"
 
-    api_key = os.getenv("XAI_API_KEY")
-    if not api_key:
-        raise ValueError("XAI_API_KEY environment variable is required")
-
     headers = {
         "Content-Type": "application/json",
         "Authorization": f"Bearer {api_key}"
@@ -219,7 +330,7 @@ async def call_grok_api(messages):
     data = {
         "messages": messages,
         "model": "grok-4",
-        "stream": False,
+        "stream": True,
         "temperature": 0.7
     }
 
@@ -229,45 +340,42 @@ async def call_grok_api(messages):
     while retry_count < max_retries:
         try:
             logger.info(f"Calling Grok-4 API (attempt {retry_count + 1}/{max_retries})")
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    "https://api.x.ai/v1/chat/completions",
-                    headers=headers,
-                    json=data,
-                    timeout=aiohttp.ClientTimeout(total=300)
-                ) as response:
-                    if response.status == 200:
-                        result = await response.json()
-
-                        content = result["choices"][0]["message"]["content"]
-                        reasoning = result["choices"][0]["message"].get("reasoning_content", "")
-
-                        if reasoning:
-                            full_response = f"## Reasoning Process\n{reasoning}\n\n## Response\n{content}"
-                        else:
-                            full_response = content
-
-                        if "usage" in result:
-                            usage = result["usage"]
-                            logger.info(f"Tokens used - Completion: {usage.get('completion_tokens', 0)}, Reasoning: {usage.get('reasoning_tokens', 0)}")
-
-                        circuit_breaker.record_success()
-                        return full_response
+            session = await _get_session()
+            async with session.post(
+                "https://api.x.ai/v1/chat/completions",
+                headers=headers,
+                data=json_dumps(data),
+                timeout=aiohttp.ClientTimeout(total=None, sock_connect=30, sock_read=STREAM_READ_TIMEOUT)
+            ) as response:
+                if response.status == 200:
+                    content, reasoning, usage = await read_completion(response)
+
+                    if reasoning:
+                        full_response = f"## Reasoning Process\n{reasoning}\n\n## Response\n{content}"
                     else:
-                        error_text = await response.text()
-                        logger.error(f"API error {response.status}: {error_text}")
+                        full_response = content
 
-                        if response.status >= 500:  # Server errors - retry
-                            retry_count += 1
-                            if retry_count < max_retries:
-                                await asyncio.sleep(2 ** retry_count)  # Exponential backoff
-                                continue
+                    if usage:
+                        logger.info(f"Tokens used - Completion: {usage.get('completion_tokens', 0)}, Reasoning: {usage.get('reasoning_tokens', 0)}")
 
-                        circuit_breaker.record_failure()
-                        return f"Error calling Grok-4 API: {response.status} - {error_text}"
+                    circuit_breaker.record_success()
+                    await _CACHE.put("grok_chat", cache_token, full_response)
+                    return full_response
+                else:
+                    error_text = await response.text()
+                    logger.error(f"API error {response.status}: {error_text}")
+
+                    if response.status >= 500:  # Server errors - retry
+                        retry_count += 1
+                        if retry_count < max_retries:
+                            await asyncio.sleep(2 ** retry_count)  # Exponential backoff
+                            continue
+
+                    circuit_breaker.record_failure()
+                    return f"Error calling Grok-4 API: {response.status} - {error_text}"
 
         except asyncio.TimeoutError:
-            logger.error("Request timeout after 5 minutes")
+            logger.error(f"Request timed out (no data for {STREAM_READ_TIMEOUT}s)")
             retry_count += 1
             if retry_count < max_retries:
                 await asyncio.sleep(2 ** retry_count)
@@ -297,17 +405,25 @@ async def call_grok_api(messages):
     circuit_breaker.record_failure()
     return f"Failed to call Grok-4 API after {max_retries} retries"
 
-def handle_tools_call(name, arguments):
+def _read_text(file_path):
+    with open(file_path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+async def read_file(file_path):
+    """Read one attached file off the event loop, formatted as a headed section"""
+    try:
+        async with _FILE_SEMAPHORE:
+            content = await asyncio.to_thread(_read_text, file_path)
+        return f"===== {file_path} =====\n{content}"
+    except Exception as e:
+        return f"===== {file_path} =====\n[ERROR: Could not read file - {str(e)}]"
+
+async def handle_tools_call(name, arguments):
     """Handle tools/call request"""
     try:
         if name == "grok_health":
             # Run health check
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            try:
-                health_result = loop.run_until_complete(check_api_health())
-            finally:
-                loop.close()
+            health_result = await check_api_health()
 
             # Format health result as readable text
             status_emoji = "" if health_result["status"] == "healthy" else ""
@@ -340,34 +456,21 @@ def handle_tools_call(name, arguments):
                 raise ValueError("messages parameter is required")
 
             # Process files if provided
-            processed_messages = messages.copy()
+            processed_messages = messages
             if files:
-                file_contents = []
-                for file_path in files:
-                    try:
-                        with open(file_path, 'r', encoding='utf-8') as f:
-                            content = f.read()
-                            file_contents.append(f"===== {file_path} =====\n{content}")
-                    except Exception as e:
-                        file_contents.append(f"===== {file_path} =====\n[ERROR: Could not read file - {str(e)}]")
-
-                # Add file contents to the last user message
-                if processed_messages and processed_messages[-1]["role"] == "user":
-                    processed_messages[-1]["content"] += "\n\n## INCLUDED FILES FOR ANALYSIS\n\n" + "\n\n".join(file_contents)
+                file_contents = await asyncio.gather(*[read_file(file_path) for file_path in files])
+                files_block = "## INCLUDED FILES FOR ANALYSIS\n\n" + "\n\n".join(file_contents)
+
+                # Add file contents to the last user message (as a new dict, so the
+                # caller's messages are never modified)
+                if messages[-1]["role"] == "user":
+                    last = messages[-1]
+                    processed_messages = [*messages[:-1], {**last, "content": f"{last['content']}\n\n{files_block}"}]
                 else:
                     # If no user message, create one with just the files
-                    processed_messages.append({
-                        "role": "user",
-                        "content": "## INCLUDED FILES FOR ANALYSIS\n\n" + "\n\n".join(file_contents)
-                    })
-
-            # Run the async function in sync context
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            try:
-                content = loop.run_until_complete(call_grok_api(processed_messages))
-            finally:
-                loop.close()
+                    processed_messages = [*messages, {"role": "user", "content": files_block}]
+
+            content = await call_grok_api(processed_messages)
 
             return {
                 "content": [
@@ -385,54 +488,77 @@ def handle_tools_call(name, arguments):
         logger.error(f"Tool call failed for {name}: {str(e)}")
         raise ValueError(f"{name} failed: {str(e)}")
 
-def main():
+async def handle_request(request):
+    """Dispatch one JSON-RPC request and send its response"""
+    method = request.get("method")
+    params = request.get("params", {})
+    request_id = request.get("id")
+    
+    try:
+        if method == "initialize":
+            result = handle_initialize(params)
+        elif method == "tools/list":
+            result = handle_tools_list()
+        elif method == "tools/call":
+            tool_name = params.get("name")
+            arguments = params.get("arguments", {})
+            async with _SEMAPHORE:
+                result = await handle_tools_call(tool_name, arguments)
+        else:
+            raise ValueError(f"Unknown method: {method}")
+        
+        # Send success response
+        response = {
+            "jsonrpc": "2.0",
+            "id": request_id,
+            "result": result
+        }
+        send_message(response)
+        
+    except Exception as e:
+        # Send error response
+        error_response = {
+            "jsonrpc": "2.0",
+            "id": request_id,
+            "error": {
+                "code": -32603,
+                "message": str(e)
+            }
+        }
+        send_message(error_response)
+
+async def main_async():
     """Main MCP server loop"""
+    reader = await open_stdin_reader()
+    
+    # Each request runs as its own task so slow upstream calls overlap; responses
+    # may go out of order since each carries its request id
+    pending = set()
     while True:
         try:
-            request = receive_message()
+            request = await receive_message(reader)
             if request is None:
                 break
-            
-            method = request.get("method")
-            params = request.get("params", {})
-            request_id = request.get("id")
-            
-            try:
-                if method == "initialize":
-                    result = handle_initialize(params)
-                elif method == "tools/list":
-                    result = handle_tools_list()
-                elif method == "tools/call":
-                    tool_name = params.get("name")
-                    arguments = params.get("arguments", {})
-                    result = handle_tools_call(tool_name, arguments)
-                else:
-                    raise ValueError(f"Unknown method: {method}")
-                
-                # Send success response
-                response = {
-                    "jsonrpc": "2.0",
-                    "id": request_id,
-                    "result": result
-                }
-                send_message(response)
-                
-            except Exception as e:
-                # Send error response
-                error_response = {
-                    "jsonrpc": "2.0",
-                    "id": request_id,
-                    "error": {
-                        "code": -32603,
-                        "message": str(e)
-                    }
-                }
-                send_message(error_response)
-                
-        except KeyboardInterrupt:
-            break
         except Exception:
             break
+        
+        task = asyncio.create_task(handle_request(request))
+        pending.add(task)
+        task.add_done_callback(pending.discard)
+    
+    # Let in-flight calls finish and answer before exiting
+    if pending:
+        await asyncio.gather(*pending, return_exceptions=True)
+    
+    if _session is not None:
+        await _session.close()
+
+def main():
+    """Run the server on a single event loop for the life of the process"""
+    try:
+        asyncio.run(main_async())
+    except KeyboardInterrupt:
+        pass
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,381 @@
+"""
+Response cache shared by the LLM proxy MCP servers (gpt5-proxy, grok-proxy)
+
+Two layers, both in one SQLite file. An exact layer keyed by the SHA-256 of
+(tool, model, messages) answers verbatim re-asks without any embedding call;
+its entries live EXACT_CACHE_TTL (7 days by default). Behind it, prompts are
+embedded (Ollama nomic-embed-text; OpenAI text-embedding-3-small only when
+LLM_CACHE_OPENAI_EMBED=1, since that sends prompts to a third party) and
+stored next to the response. Only the last user turn is embedded; everything
+before it must match exactly (context_hash), so requests sharing a long
+history but asking different questions never share an answer. A later prompt
+whose embedding is within SIMILARITY_THRESHOLD cosine similarity of a fresh
+entry with the same namespace and context gets the stored response back
+instead of a new upstream call. Turns longer than MAX_EMBED_CHARS only use the
+exact layer: their embedding would cover just the head, so turns differing
+only further on would look identical. Uses the sqlite-vec extension for the
+distance search when installed, otherwise compares in Python.
+
+Web search results get the same treatment in their own table, keyed by the
+query embedding, so similar queries skip the search API round trip.
+
+Only INFORMATIONAL requests are cached; COMMAND requests (the last user message
+asks for an action, see classify_request) always go upstream.
+
+Every failure (no embedding service, locked database, ...) is a cache miss;
+the cache never makes a proxy call fail.
+"""
+
+import array
+import asyncio
+import hashlib
+import json
+import math
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+import urllib.request
+from pathlib import Path
+
+try:
+    import sqlite_vec
+except ImportError:
+    sqlite_vec = None
+
+CACHE_DB = Path(os.environ.get("LLM_CACHE_DB", str(Path.home() / ".cache" / "mango" / "llm_cache.sqlite3")))
+CACHE_TTL = int(os.environ.get("LLM_CACHE_TTL", "3600"))
+EXACT_CACHE_TTL = int(os.environ.get("LLM_CACHE_EXACT_TTL", str(7 * 24 * 3600)))
+SIMILARITY_THRESHOLD = float(os.environ.get("LLM_CACHE_SIMILARITY", "0.92"))
+CACHE_DISABLED = os.environ.get("LLM_CACHE_DISABLE", "") == "1"
+
+# Web search results are reused for queries at least this similar, for this long
+SEARCH_CACHE_TTL = int(os.environ.get("LLM_CACHE_SEARCH_TTL", "3600"))
+SEARCH_SIMILARITY_THRESHOLD = float(os.environ.get("LLM_CACHE_SEARCH_SIMILARITY", "0.9"))
+
+OLLAMA_URL = os.environ.get("OLLAMA_URL", "http://localhost:11434")
+OLLAMA_EMBED_MODEL = os.environ.get("LLM_CACHE_EMBED_MODEL", "nomic-embed-text")
+OPENAI_EMBED_MODEL = "text-embedding-3-small"
+# Off by default: the OpenAI fallback ships prompt text to a third party
+OPENAI_EMBED_ENABLED = os.environ.get("LLM_CACHE_OPENAI_EMBED", "") == "1"
+EMBED_TIMEOUT = 5
+
+# Longest text sent for embedding (the embedding models cap input length);
+# longer prompts skip the semantic layer
+MAX_EMBED_CHARS = 24000
+
+# Requests are INFORMATIONAL (answer depends only on the prompt, safe to reuse)
+# or COMMAND (asks for an action); COMMAND requests are never cached
+REQUEST_INFORMATIONAL = "INFORMATIONAL"
+REQUEST_COMMAND = "COMMAND"
+
+# Action phrases anywhere in the last user message, or an imperative opening verb
+COMMAND_PATTERN = re.compile(r"\b(?:send|execute|write (?:a |the |to )?file|delete|deploy)\b", re.IGNORECASE)
+COMMAND_VERB_PATTERN = re.compile(r"^\s*(?:please\s+)?(?:send|write|execute|run|delete|create|invoke|call)\b", re.IGNORECASE)
+
+# Callers can opt a prompt out of caching by including this marker anywhere in it
+NO_CACHE_MARKER = "do not cache"
+
+
+def flatten(messages):
+    """Flatten a messages list (or a plain prompt string) into one text"""
+    if isinstance(messages, str):
+        return messages
+    return "\n".join(f"{msg.get('role', '')}: {msg.get('content', '')}" for msg in messages)
+
+
+def cache_key(namespace, model, messages):
+    """SHA-256 over (tool, model, messages), independent of dict key order"""
+    payload = json.dumps({"namespace": namespace, "model": model, "messages": messages}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def split_last_turn(messages):
+    """Split messages into (hash of everything but the last user turn, text of that turn)"""
+    if isinstance(messages, str):
+        return hashlib.sha256(b"[]").hexdigest(), messages
+    index = next((i for i in range(len(messages) - 1, -1, -1) if messages[i].get("role") == "user"), None)
+    if index is None:
+        return hashlib.sha256(json.dumps(messages, sort_keys=True).encode()).hexdigest(), ""
+    context = [*messages[:index], {"role": "user", "content": None}, *messages[index + 1:]]
+    context_hash = hashlib.sha256(json.dumps(context, sort_keys=True).encode()).hexdigest()
+    return context_hash, str(messages[index].get("content", ""))
+
+
+def classify_request(messages):
+    """REQUEST_COMMAND if the last user message asks for an action, else REQUEST_INFORMATIONAL"""
+    if isinstance(messages, str):
+        text = messages
+    else:
+        text = next((str(msg.get("content", "")) for msg in reversed(messages) if msg.get("role") == "user"), "")
+    if COMMAND_VERB_PATTERN.match(text) or COMMAND_PATTERN.search(text):
+        return REQUEST_COMMAND
+    return REQUEST_INFORMATIONAL
+
+
+def is_cacheable(messages, request_type=None):
+    """False for COMMAND requests and prompts carrying the no-cache marker"""
+    if NO_CACHE_MARKER in flatten(messages).lower():
+        return False
+    return (request_type or classify_request(messages)) != REQUEST_COMMAND
+
+
+def _post_json(url, payload, headers=None):
+    request = urllib.request.Request(
+        url,
+        data=json.dumps(payload).encode(),
+        headers={"Content-Type": "application/json", **(headers or {})},
+    )
+    with urllib.request.urlopen(request, timeout=EMBED_TIMEOUT) as response:
+        return json.loads(response.read())
+
+
+def embed(text):
+    """Return (model name, embedding) for text, or (None, None) if no embedding service answers"""
+    text = text[:MAX_EMBED_CHARS]
+    try:
+        result = _post_json(f"{OLLAMA_URL}/api/embeddings", {"model": OLLAMA_EMBED_MODEL, "prompt": text})
+        if result.get("embedding"):
+            return OLLAMA_EMBED_MODEL, result["embedding"]
+    except Exception:
+        pass
+
+    api_key = os.environ.get("OPENAI_API_KEY")
+    if OPENAI_EMBED_ENABLED and api_key:
+        try:
+            result = _post_json(
+                "https://api.openai.com/v1/embeddings",
+                {"model": OPENAI_EMBED_MODEL, "input": text},
+                {"Authorization": f"Bearer {api_key}"},
+            )
+            return OPENAI_EMBED_MODEL, result["data"][0]["embedding"]
+        except Exception:
+            pass
+    return None, None
+
+
+def _cosine_similarity(a, b):
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+# Upstream calls currently running, by cache_key: [task, number of callers awaiting it]
+_INFLIGHT = {}
+
+
+async def coalesce(key, make_call):
+    """Await make_call(), sharing one in-flight call among concurrent callers with the same key
+
+    The shared call is cancelled only once every caller waiting on it has been cancelled.
+    """
+    entry = _INFLIGHT.get(key)
+    if entry is None:
+        entry = [asyncio.ensure_future(make_call()), 0]
+        _INFLIGHT[key] = entry
+        entry[0].add_done_callback(lambda _: _INFLIGHT.pop(key, None) if _INFLIGHT.get(key) is entry else None)
+
+    task = entry[0]
+    entry[1] += 1
+    try:
+        return await asyncio.shield(task)
+    finally:
+        entry[1] -= 1
+        if entry[1] == 0 and not task.done():
+            task.cancel()
+
+
+class SemanticCache:
+    """SQLite-backed exact + semantic cache; the sync methods run in worker threads via get/put"""
+
+    def __init__(self, path=CACHE_DB):
+        self.path = Path(path)
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS semantic_cache (
+                    id INTEGER PRIMARY KEY,
+                    namespace TEXT NOT NULL,
+                    context_hash TEXT,
+                    embed_model TEXT NOT NULL,
+                    embedding BLOB NOT NULL,
+                    response TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+            """)
+            # Databases from before context_hash: old rows keep NULL and never match
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(semantic_cache)")}
+            if "context_hash" not in columns:
+                conn.execute("ALTER TABLE semantic_cache ADD COLUMN context_hash TEXT")
+            conn.execute("CREATE INDEX IF NOT EXISTS by_namespace ON semantic_cache(namespace, embed_model, created_at)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS llm_cache (
+                    key TEXT NOT NULL,
+                    response TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS by_hash ON llm_cache(key)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS search_cache (
+                    id INTEGER PRIMARY KEY,
+                    query TEXT NOT NULL,
+                    embed_model TEXT NOT NULL,
+                    embedding BLOB NOT NULL,
+                    results TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS by_search_model ON search_cache(embed_model, created_at)")
+            if sqlite_vec is not None:
+                conn.enable_load_extension(True)
+                sqlite_vec.load(conn)
+                conn.enable_load_extension(False)
+            self._conn = conn
+        return self._conn
+
+    def _nearest(self, table, column, where, params, blob, vector, threshold):
+        """column of the row in table (filtered by where) most similar to the embedding, if within threshold"""
+        conn = self._connect()
+        if sqlite_vec is not None:
+            row = conn.execute(
+                f"SELECT {column}, vec_distance_cosine(embedding, ?) AS distance FROM {table} "
+                f"WHERE {where} ORDER BY distance LIMIT 1",
+                (blob, *params),
+            ).fetchone()
+            return row[0] if row and 1 - row[1] >= threshold else None
+
+        rows = conn.execute(f"SELECT {column}, embedding FROM {table} WHERE {where}", params).fetchall()
+        best, best_similarity = None, threshold
+        for value, stored in rows:
+            similarity = _cosine_similarity(vector, array.array("f", stored))
+            if similarity >= best_similarity:
+                best, best_similarity = value, similarity
+        return best
+
+    def lookup(self, namespace, messages, model=None, request_type=None):
+        """Return (cached response or None, token to pass to store); a no-op for COMMAND requests"""
+        if CACHE_DISABLED or not is_cacheable(messages, request_type):
+            return None, None
+
+        key = cache_key(namespace, model, messages)
+        now = time.time()
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT response FROM llm_cache WHERE key = ? AND expires_at > ?", (key, now)
+            ).fetchone()
+        if row:
+            return row[0], None
+
+        context_hash, text = split_last_turn(messages)
+        if not text or len(text) > MAX_EMBED_CHARS:
+            return None, (key, None, None, None)
+
+        embed_model, vector = embed(text)
+        if vector is None:
+            return None, (key, None, None, None)
+
+        blob = array.array("f", vector).tobytes()
+        token = (key, context_hash, embed_model, blob)
+        cutoff = now - CACHE_TTL
+
+        with self._lock:
+            best = self._nearest(
+                "semantic_cache", "response",
+                "namespace = ? AND context_hash = ? AND embed_model = ? AND created_at > ?",
+                (namespace, context_hash, embed_model, cutoff), blob, vector, SIMILARITY_THRESHOLD,
+            )
+        return best, token
+
+    def store(self, namespace, token, response):
+        """Store a response under the hash key, context hash and embedding computed by lookup"""
+        if token is None:
+            return
+        key, context_hash, embed_model, blob = token
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (now,))
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, response, created_at, expires_at) VALUES (?, ?, ?, ?)",
+                (key, response, now, now + EXACT_CACHE_TTL),
+            )
+            if blob is not None:
+                conn.execute("DELETE FROM semantic_cache WHERE created_at <= ?", (now - CACHE_TTL,))
+                conn.execute(
+                    "INSERT INTO semantic_cache (namespace, context_hash, embed_model, embedding, response, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (namespace, context_hash, embed_model, blob, response, now),
+                )
+            conn.commit()
+
+    def lookup_search(self, query):
+        """Return (cached search results or None, token to pass to store_search)"""
+        if CACHE_DISABLED:
+            return None, None
+
+        embed_model, vector = embed(query)
+        if vector is None:
+            return None, None
+
+        blob = array.array("f", vector).tobytes()
+        with self._lock:
+            results = self._nearest(
+                "search_cache", "results", "embed_model = ? AND created_at > ?",
+                (embed_model, time.time() - SEARCH_CACHE_TTL), blob, vector, SEARCH_SIMILARITY_THRESHOLD,
+            )
+        return (json.loads(results) if results is not None else None), (query, embed_model, blob)
+
+    def store_search(self, token, results):
+        """Store search results under the query embedding computed by lookup_search"""
+        if token is None:
+            return
+        query, embed_model, blob = token
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM search_cache WHERE created_at <= ?", (now - SEARCH_CACHE_TTL,))
+            conn.execute(
+                "INSERT INTO search_cache (query, embed_model, embedding, results, created_at) VALUES (?, ?, ?, ?, ?)",
+                (query, embed_model, blob, json.dumps(results), now),
+            )
+            conn.commit()
+
+    async def get(self, namespace, messages, model=None, request_type=None):
+        """Async lookup; returns (response or None, token). Errors count as a miss."""
+        try:
+            return await asyncio.to_thread(self.lookup, namespace, messages, model, request_type)
+        except Exception as e:
+            print(f"[llm-cache] lookup failed: {e}", file=sys.stderr)
+            return None, None
+
+    async def put(self, namespace, token, response):
+        """Async store; errors are logged and ignored"""
+        try:
+            await asyncio.to_thread(self.store, namespace, token, response)
+        except Exception as e:
+            print(f"[llm-cache] store failed: {e}", file=sys.stderr)
+
+    async def get_search(self, query):
+        """Async lookup_search; returns (results or None, token). Errors count as a miss."""
+        try:
+            return await asyncio.to_thread(self.lookup_search, query)
+        except Exception as e:
+            print(f"[llm-cache] search lookup failed: {e}", file=sys.stderr)
+            return None, None
+
+    async def put_search(self, token, results):
+        """Async store_search; errors are logged and ignored"""
+        try:
+            await asyncio.to_thread(self.store_search, token, results)
+        except Exception as e:
+            print(f"[llm-cache] search store failed: {e}", file=sys.stderr)
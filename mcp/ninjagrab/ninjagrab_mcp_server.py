@@ -5,66 +5,209 @@ Simple ninjagrab MCP server using basic MCP protocol over stdio
 Provides file collection functionality equivalent to ninjagrab.sh
 """
 
+import asyncio
 import json
+import mmap
 import sys
 import os
+import stat
 import subprocess
-from pathlib import Path
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+# orjson encodes/decodes JSON-RPC lines much faster when available; stdlib json otherwise
+try:
+    import orjson
+    json_loads = orjson.loads
+    
+    def json_line(message):
+        return orjson.dumps(message) + b"\n"
+except ImportError:
+    json_loads = json.loads
+    
+    def json_line(message):
+        return json.dumps(message).encode() + b"\n"
+
+# Written in the working directory, like ninjagrab.sh does
+OUTPUT_FILE = "ninjagrab-out.txt"
+
+# Only these file types are collected
+ALLOWED_EXTENSIONS = frozenset({'.json', '.yaml', '.yml', '.py', '.R', '.sh'})
+
+NEWLINE = b"\n"
+
+# Per-file delimiter is DELIM_PREFIX + path + DELIM_SUFFIX
+DELIM_PREFIX = b"===== "
+DELIM_SUFFIX = b" =====\n"
+
+# Files at least this large are copied with sendfile() instead of being read into memory
+SENDFILE_THRESHOLD = 1 << 20
+COPY_CHUNK_SIZE = 1 << 20
+
+# Small files are read ahead by a thread pool while earlier ones are written;
+# at most READ_WINDOW reads are queued or held at once
+READ_WORKERS = 8
+READ_WINDOW = 16
+
+# ninjagrab.sh to delegate to, resolved once at startup; changing
+# NINJAGRAB_SCRIPT_PATH or creating the script needs a server restart.
+# Made absolute here because tools/call runs it after chdir()ing.
+_NINJAGRAB_SCRIPT = os.environ.get('NINJAGRAB_SCRIPT_PATH')
+_NINJAGRAB_SCRIPT = os.path.abspath(_NINJAGRAB_SCRIPT) if _NINJAGRAB_SCRIPT and os.path.isfile(_NINJAGRAB_SCRIPT) else None
+
+# Small files' delimiters, contents and newlines are batched into one writev()
+# until the batch holds this many bytes or buffers
+WRITE_BATCH_BYTES = 1 << 20
+WRITE_BATCH_BUFFERS = 512
+
+# Most buffers one writev() call accepts
+IOV_MAX = os.sysconf("SC_IOV_MAX") if hasattr(os, "sysconf") else 1024
+
+def write_all(fd, buffers):
+    """Write buffers with as few writev() calls as possible, resuming after short writes"""
+    buffers = [memoryview(b) for b in buffers if b]
+    i = 0
+    while i < len(buffers):
+        written = os.writev(fd, buffers[i:i + IOV_MAX])
+        while written:
+            size = len(buffers[i])
+            if written >= size:
+                written -= size
+                i += 1
+            else:
+                buffers[i] = buffers[i][written:]
+                written = 0
+
+# Largest JSON-RPC line accepted on stdin (file lists can be long)
+STDIN_LINE_LIMIT = 64 * 1024 * 1024
+
+# Binary stdout, looked up once; each message goes out as a single write
+_STDOUT = sys.stdout.buffer
 
 def send_message(message):
     """Send a JSON-RPC message to stdout"""
-    print(json.dumps(message))
-    sys.stdout.flush()
+    _STDOUT.write(json_line(message))
+    _STDOUT.flush()
 
-def receive_message():
+async def open_stdin_reader():
+    """Wrap stdin in an asyncio StreamReader so reads don't block the event loop"""
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader(limit=STDIN_LINE_LIMIT)
+    await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+    return reader
+
+async def receive_message(reader):
     """Receive a JSON-RPC message from stdin"""
     try:
-        line = sys.stdin.readline()
+        line = await reader.readline()
         if not line:
             return None
-        return json.loads(line.strip())
+        return json_loads(line)
     except json.JSONDecodeError:
         return None
 
+def copy_file(out_fd, file_path, size):
+    """
+    Copy size bytes of file_path to out_fd in-kernel with sendfile(). If sendfile()
+    fails, the rest is written straight from an mmap of the file (no userspace
+    copy), or with a read/write loop if the file can't be mapped.
+    """
+    with open(file_path, 'rb') as src_f:
+        offset = 0
+        try:
+            while offset < size:
+                sent = os.sendfile(out_fd, src_f.fileno(), offset, size - offset)
+                if sent == 0:
+                    break
+                offset += sent
+            return
+        except OSError:
+            pass
+
+        try:
+            mm = mmap.mmap(src_f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            mm = None
+
+        if mm is not None:
+            with mm, memoryview(mm) as view:
+                write_all(out_fd, [view[offset:size]])
+            return
+
+        src_f.seek(offset)
+        for chunk in iter(lambda: src_f.read(COPY_CHUNK_SIZE), b""):
+            write_all(out_fd, [chunk])
+
+def load_file(file_path):
+    """Stat file_path and read it if it is a small regular file; (None, None) if it can't be stat'ed"""
+    try:
+        st = os.stat(file_path)
+    except OSError:
+        return None, None
+    if stat.S_ISREG(st.st_mode) and st.st_size < SENDFILE_THRESHOLD:
+        with open(file_path, 'rb') as f:
+            return st, f.read()
+    return st, None
+
+def prefetch(executor, files):
+    """
+    Yield (file_path, future) in input order, with load_file already running
+    in the pool for up to READ_WINDOW files ahead. future is None for files whose
+    extension is not allowed; those are rejected on the name alone, with no syscall.
+    """
+    window = deque()
+    for file_path in files:
+        allowed = os.path.splitext(file_path)[1] in ALLOWED_EXTENSIONS
+        window.append((file_path, executor.submit(load_file, file_path) if allowed else None))
+        if len(window) >= READ_WINDOW:
+            yield window.popleft()
+    while window:
+        yield window.popleft()
+
+# initialize and tools/list answers never change, so they are built once
+INITIALIZE_RESULT = {
+    "protocolVersion": "2024-11-05",
+    "capabilities": {
+        "tools": {}
+    },
+    "serverInfo": {
+        "name": "ninjagrab",
+        "version": "1.0.0"
+    }
+}
+
+TOOLS_LIST_RESULT = {
+    "tools": [
+        {
+            "name": "ninjagrab_collect",
+            "description": "Concatenate multiple files with clear delimiters and save to ninjagrab-out.txt. Returns the output filepath instead of sending content directly. IMPORTANT: Only processes .json, .yaml, .yml, .py, .R, and .sh files. Other file types are filtered out.",
+            "inputSchema": {
+                "type": "object",
+                "properties": {
+                    "files": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "List of file paths to collect and concatenate (only .json, .yaml, .yml, .py, .R, .sh files)"
+                    },
+                    "working_directory": {
+                        "type": "string",
+                        "description": "Working directory to run from (defaults to current directory)",
+                        "default": "."
+                    }
+                },
+                "required": ["files"]
+            }
+        }
+    ]
+}
+
 def handle_initialize(params):
     """Handle initialize request"""
-    return {
-        "protocolVersion": "2024-11-05",
-        "capabilities": {
-            "tools": {}
-        },
-        "serverInfo": {
-            "name": "ninjagrab",
-            "version": "1.0.0"
-        }
-    }
+    return INITIALIZE_RESULT
 
 def handle_tools_list():
     """Handle tools/list request"""
-    return {
-        "tools": [
-            {
-                "name": "ninjagrab_collect",
-                "description": "Concatenate multiple files with clear delimiters and save to ninjagrab-out.txt. Returns the output filepath instead of sending content directly. IMPORTANT: Only processes .json, .yaml, .yml, .py, .R, and .sh files. Other file types are filtered out.",
-                "inputSchema": {
-                    "type": "object",
-                    "properties": {
-                        "files": {
-                            "type": "array",
-                            "items": {"type": "string"},
-                            "description": "List of file paths to collect and concatenate (only .json, .yaml, .yml, .py, .R, .sh files)"
-                        },
-                        "working_directory": {
-                            "type": "string",
-                            "description": "Working directory to run from (defaults to current directory)",
-                            "default": "."
-                        }
-                    },
-                    "required": ["files"]
-                }
-            }
-        ]
-    }
+    return TOOLS_LIST_RESULT
 
 def handle_tools_call(name, arguments):
     """Handle tools/call request"""
@@ -78,29 +221,29 @@ def handle_tools_call(name, arguments):
     original_cwd = os.getcwd()
     try:
         os.chdir(working_directory)
+        output_path = os.path.abspath(OUTPUT_FILE)
         
         # Try to use the actual ninjagrab.sh script if available
-        ninjagrab_script = os.environ.get('NINJAGRAB_SCRIPT_PATH')
-        if ninjagrab_script and os.path.isfile(ninjagrab_script):
+        if _NINJAGRAB_SCRIPT is not None:
             try:
                 # Use the actual ninjagrab.sh script
-                cmd = [ninjagrab_script] + files
-                result = subprocess.run(cmd, capture_output=True, text=True, check=False)
-
-                output_file = "ninjagrab-out.txt"
+                cmd = [_NINJAGRAB_SCRIPT] + files
+                # The script also writes everything to ninjagrab-out.txt, so its
+                # stdout copy is discarded rather than buffered and decoded
+                result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, check=False)
 
                 errors = []
                 if result.returncode != 0:
                     errors.append(f"ninjagrab.sh exited with code {result.returncode}")
                     if result.stderr:
-                        errors.append(result.stderr.strip())
+                        errors.append(result.stderr.decode('utf-8', 'replace').strip())
                 
                 return {
                     "content": [
                         {
                             "type": "text",
-                            "text": f"Files processed: {len([f for f in files if os.path.isfile(f)])}\n"
-                                   f"Output saved to: {os.path.abspath(output_file)}\n"
+                            "text": f"Files processed: {sum(map(os.path.isfile, files))}\n"
+                                   f"Output saved to: {output_path}\n"
                                    f"Errors: {errors}\n\n"
                                    f"Use the Read tool to view the collected content."
                         }
@@ -112,57 +255,72 @@ def handle_tools_call(name, arguments):
                 pass
         
         # Python implementation fallback
-        output_file = "ninjagrab-out.txt"
         errors = []
         files_processed = 0
         files_filtered = 0
 
-        # Allowed extensions
-        allowed_extensions = {'.json', '.yaml', '.yml', '.py', '.R', '.sh'}
+        # Filter/error lines are held back, then joined and encoded as one buffer
+        # ahead of the next file's delimiter. Small files are queued in iov and
+        # written a batch at a time; large ones flush the batch and are copied.
+        # The output is opened buffered (no O_DIRECT): the caller reads it back
+        # right away, and sendfile()/writev() of unaligned buffers rule it out
+        out_fd = os.open(OUTPUT_FILE, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        pending = []
+        iov = []
+        iov_bytes = 0
+        try:
+            with ThreadPoolExecutor(max_workers=READ_WORKERS) as executor:
+                for file_path, future in prefetch(executor, files):
+                    try:
+                        # Check file extension
+                        if future is None:
+                            file_extension = os.path.splitext(file_path)[1]
+                            filter_msg = f"[FILTERED] Skipping {file_path} (extension {file_extension if file_extension else 'none'} not allowed - only json, yaml, yml, py, R, sh allowed)"
+                            pending.append(f"{filter_msg}\n")
+                            files_filtered += 1
+                            continue
 
-        # Truncate/create output file
-        with open(output_file, 'w') as out_f:
-            pass
+                        st, data = future.result()
+                        if st is None or not stat.S_ISREG(st.st_mode):
+                            error_msg = f"[ERROR] {file_path} not found or not a regular file"
+                            errors.append(error_msg)
+                            pending.append(f"{error_msg}\n")
+                            continue
 
-        for file_path in files:
-            try:
-                path = Path(file_path)
-
-                # Check file extension
-                file_extension = path.suffix
-                if not file_extension or file_extension not in allowed_extensions:
-                    filter_msg = f"[FILTERED] Skipping {file_path} (extension {file_extension if file_extension else 'none'} not allowed - only json, yaml, yml, py, R, sh allowed)"
-                    with open(output_file, 'a') as out_f:
-                        out_f.write(filter_msg + '\n')
-                    files_filtered += 1
-                    continue
-
-                if not path.is_file():
-                    error_msg = f"[ERROR] {file_path} not found or not a regular file"
-                    errors.append(error_msg)
-                    with open(output_file, 'a') as out_f:
-                        out_f.write(error_msg + '\n')
-                    continue
-
-                # Create delimiter
-                delimiter = f"===== {file_path} ====="
-
-                # Read file contents and write to output file
-                with open(path, 'r', encoding='utf-8', errors='replace') as f:
-                    file_content = f.read()
-
-                with open(output_file, 'a') as out_f:
-                    out_f.write(delimiter + '\n')
-                    out_f.write(file_content)
-                    out_f.write('\n')
-
-                files_processed += 1
+                        if pending:
+                            notes = "".join(pending).encode()
+                            pending = []
+                            iov.append(notes)
+                            iov_bytes += len(notes)
 
-            except Exception as e:
-                error_msg = f"[ERROR] Failed to process {file_path}: {str(e)}"
-                errors.append(error_msg)
-                with open(output_file, 'a') as out_f:
-                    out_f.write(error_msg + '\n')
+                        # Copy the file's bytes through untouched, no decode/re-encode
+                        delimiter = DELIM_PREFIX + file_path.encode() + DELIM_SUFFIX
+                        if data is None:
+                            iov.append(delimiter)
+                            write_all(out_fd, iov)
+                            iov = []
+                            copy_file(out_fd, file_path, st.st_size)
+                            iov.append(NEWLINE)
+                            iov_bytes = 1
+                        else:
+                            iov += (delimiter, data, NEWLINE)
+                            iov_bytes += len(delimiter) + len(data) + 1
+                            if iov_bytes >= WRITE_BATCH_BYTES or len(iov) >= WRITE_BATCH_BUFFERS:
+                                write_all(out_fd, iov)
+                                iov = []
+                                iov_bytes = 0
+
+                        files_processed += 1
+
+                    except Exception as e:
+                        error_msg = f"[ERROR] Failed to process {file_path}: {str(e)}"
+                        errors.append(error_msg)
+                        pending.append(f"{error_msg}\n")
+
+            iov.append("".join(pending).encode())
+            write_all(out_fd, iov)
+        finally:
+            os.close(out_fd)
         
         return {
             "content": [
@@ -170,7 +328,7 @@ def handle_tools_call(name, arguments):
                     "type": "text",
                     "text": f"Files processed: {files_processed}\n"
                            f"Files filtered: {files_filtered}\n"
-                           f"Output saved to: {os.path.abspath(output_file)}\n"
+                           f"Output saved to: {output_path}\n"
                            f"Errors: {errors}\n\n"
                            f"Use the Read tool to view the collected content."
                 }
@@ -180,54 +338,79 @@ def handle_tools_call(name, arguments):
     finally:
         os.chdir(original_cwd)
 
-def main():
+# tools/call does blocking file I/O and chdir()s into its working directory,
+# which is process-wide, so calls run one at a time on this worker thread
+_TOOLS_EXECUTOR = ThreadPoolExecutor(max_workers=1)
+
+async def handle_request(request):
+    """Dispatch one JSON-RPC request and send its response"""
+    method = request.get("method")
+    params = request.get("params", {})
+    request_id = request.get("id")
+    
+    try:
+        if method == "initialize":
+            result = handle_initialize(params)
+        elif method == "tools/list":
+            result = handle_tools_list()
+        elif method == "tools/call":
+            tool_name = params.get("name")
+            arguments = params.get("arguments", {})
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(_TOOLS_EXECUTOR, handle_tools_call, tool_name, arguments)
+        else:
+            raise ValueError(f"Unknown method: {method}")
+        
+        # Send success response
+        response = {
+            "jsonrpc": "2.0",
+            "id": request_id,
+            "result": result
+        }
+        send_message(response)
+        
+    except Exception as e:
+        # Send error response
+        error_response = {
+            "jsonrpc": "2.0",
+            "id": request_id,
+            "error": {
+                "code": -32603,
+                "message": str(e)
+            }
+        }
+        send_message(error_response)
+
+async def main_async():
     """Main MCP server loop"""
+    reader = await open_stdin_reader()
+    
+    # Each request runs as its own task, so initialize and tools/list are
+    # answered while a tools/call is still collecting files; responses may
+    # go out of order since each carries its request id
+    pending = set()
     while True:
         try:
-            request = receive_message()
+            request = await receive_message(reader)
             if request is None:
                 break
-            
-            method = request.get("method")
-            params = request.get("params", {})
-            request_id = request.get("id")
-            
-            try:
-                if method == "initialize":
-                    result = handle_initialize(params)
-                elif method == "tools/list":
-                    result = handle_tools_list()
-                elif method == "tools/call":
-                    tool_name = params.get("name")
-                    arguments = params.get("arguments", {})
-                    result = handle_tools_call(tool_name, arguments)
-                else:
-                    raise ValueError(f"Unknown method: {method}")
-                
-                # Send success response
-                response = {
-                    "jsonrpc": "2.0",
-                    "id": request_id,
-                    "result": result
-                }
-                send_message(response)
-                
-            except Exception as e:
-                # Send error response
-                error_response = {
-                    "jsonrpc": "2.0",
-                    "id": request_id,
-                    "error": {
-                        "code": -32603,
-                        "message": str(e)
-                    }
-                }
-                send_message(error_response)
-                
-        except KeyboardInterrupt:
-            break
         except Exception:
             break
+        
+        task = asyncio.create_task(handle_request(request))
+        pending.add(task)
+        task.add_done_callback(pending.discard)
+    
+    # Let in-flight calls finish and answer before exiting
+    if pending:
+        await asyncio.gather(*pending, return_exceptions=True)
+
+def main():
+    """Run the server on a single event loop for the life of the process"""
+    try:
+        asyncio.run(main_async())
+    except KeyboardInterrupt:
+        pass
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
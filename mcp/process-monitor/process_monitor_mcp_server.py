@@ -6,17 +6,24 @@ Monitors a process until completion with smart timeout handling to avoid 2hr sys
 Enhanced with Pushover notifications and W&B metrics reporting
 """
 
+import atexit
 import json
 import sys
 import os
+import math
+import select
 import time
 import signal
+import smtplib
 import subprocess
 import base64
 import socket
+import string
 import requests
+from requests.adapters import HTTPAdapter
 from datetime import datetime
-from collections import deque
+from email.mime.text import MIMEText
+from email.mime.multipart import MIMEMultipart
 
 SYSTEM_TIMEOUT_WARNING = """
 IMPORTANT: This monitor will timeout after 1hr 55min due to Claude Code's 2-hour 
@@ -24,6 +31,17 @@ foreground process limit. This timeout does NOT mean your background process has
 finished - it only means the monitor needs to restart to avoid system termination.
 """
 
+PUSHOVER_URL = "https://api.pushover.net/1/messages.json"
+
+# One pooled session for all Pushover calls, so hourly updates reuse the
+# keep-alive TLS connection instead of handshaking each time
+_PUSHOVER_SESSION = requests.Session()
+_PUSHOVER_SESSION.mount("https://", HTTPAdapter(pool_connections=2, pool_maxsize=4))
+atexit.register(_PUSHOVER_SESSION.close)
+
+# Looked up once; it doesn't change while the server runs
+_HOSTNAME = socket.gethostname()
+
 def send_message(message):
     """Send a JSON-RPC message to stdout"""
     print(json.dumps(message))
@@ -51,6 +69,13 @@ def process_exists(pid):
     except ValueError:
         return False  # Invalid PID
 
+def open_pidfd(pid):
+    """Open a pidfd that becomes readable when the process exits (None if unsupported)"""
+    try:
+        return os.pidfd_open(pid)
+    except (AttributeError, OSError):
+        return None  # No pidfd_open (non-Linux or kernel < 5.3), or process already gone
+
 def get_process_info(pid):
     """Get basic process information"""
     try:
@@ -174,14 +199,70 @@ def handle_tools_call(name, arguments):
     else:
         raise ValueError(f"Unknown tool: {name}")
 
+# SMTP session kept open between crash emails; checked with NOOP before reuse.
+# Every socket operation on it times out, so a half-open connection left
+# behind hours earlier can't hang the NOOP and block the crash report.
+SMTP_TIMEOUT = 30
+_SMTP_CONN = None
+
+def get_smtp_connection(smtp_server, smtp_port, sender_email, sender_password):
+    """Return the open SMTP session if it still answers NOOP, else connect and log in again"""
+    global _SMTP_CONN
+    if _SMTP_CONN is not None:
+        try:
+            if _SMTP_CONN.noop()[0] == 250:
+                return _SMTP_CONN
+        except (smtplib.SMTPException, OSError):
+            pass
+        # Dead session: drop the socket without a QUIT that could wait out another timeout
+        _SMTP_CONN.close()
+        _SMTP_CONN = None
+    
+    server = smtplib.SMTP(smtp_server, smtp_port, timeout=SMTP_TIMEOUT)
+    try:
+        server.starttls()
+        server.login(sender_email, sender_password)
+    except Exception:
+        server.close()
+        raise
+    _SMTP_CONN = server
+    return server
+
+def close_smtp_connection():
+    """Quit the cached SMTP session, if any"""
+    global _SMTP_CONN
+    server, _SMTP_CONN = _SMTP_CONN, None
+    if server is not None:
+        try:
+            server.quit()
+        except (smtplib.SMTPException, OSError):
+            server.close()
+
+atexit.register(close_smtp_connection)
+
+# Crash email body, filled in per report
+_CRASH_TEMPLATE = string.Template("""## Training Process Termination Report
+
+**Process ID:** $pid
+**Log File:** $log_path
+**Hostname:** $host
+**Detected:** $ts
+
+## Last 2000 Lines of Training Log
+
+```
+$tail
+```
+
+## Summary
+The training process has terminated unexpectedly. Please review the log above for error details.
+
+---
+*This is an automated crash report from the process monitor.*""")
+
 def send_crash_email(pid, log_path, log_content):
     """Send crash report email directly"""
     try:
-        import smtplib
-        from email.mime.text import MIMEText
-        from email.mime.multipart import MIMEMultipart
-        import socket
-        
         # Email configuration (from environment)
         smtp_server = os.getenv("SMTP_SERVER", "smtp.gmail.com")
         smtp_port = int(os.getenv("SMTP_PORT", "587"))
@@ -203,32 +284,24 @@ def send_crash_email(pid, log_path, log_content):
         msg['Importance'] = 'high'
         
         # Email body
-        body = f"""## Training Process Termination Report
-
-**Process ID:** {pid}
-**Log File:** {log_path}
-**Hostname:** {socket.gethostname()}
-**Detected:** {datetime.now().isoformat()}
-
-## Last 2000 Lines of Training Log
-
-```
-{log_content}
-```
-
-## Summary
-The training process has terminated unexpectedly. Please review the log above for error details.
-
----
-*This is an automated crash report from the process monitor.*"""
+        body = _CRASH_TEMPLATE.substitute(
+            pid=pid,
+            log_path=log_path,
+            host=_HOSTNAME,
+            ts=datetime.now().isoformat(),
+            tail=log_content
+        )
         
         msg.attach(MIMEText(body, 'plain'))
         
-        # Send email
-        with smtplib.SMTP(smtp_server, smtp_port) as server:
-            server.starttls()
-            server.login(sender_email, sender_password)
+        # Send email over the cached session; drop it if the send fails so the
+        # next email reconnects
+        server = get_smtp_connection(smtp_server, smtp_port, sender_email, sender_password)
+        try:
             server.send_message(msg)
+        except Exception:
+            close_smtp_connection()
+            raise
         
         # Silent - email sent
         return True
@@ -236,20 +309,59 @@ The training process has terminated unexpectedly. Please review the log above fo
         # Silent - failed but don't flood output
         return False
 
-def get_log_tail(log_path, lines=500):
-    """Get the last N lines from a log file"""
+# Bytes read per step when tailing a log backwards
+LOG_TAIL_CHUNK_SIZE = 64 * 1024
+
+def get_log_tails(log_path, counts=(500, 2000)):
+    """Get the last N lines from a log file for each N in counts, reading it once"""
     try:
         if not os.path.exists(log_path):
-            return f"Log file not found: {log_path}"
+            return dict.fromkeys(counts, f"Log file not found: {log_path}")
         
-        with open(log_path, 'r') as f:
-            # Read all lines for small files, or use deque for large files
-            return ''.join(deque(f, maxlen=lines))
+        lines = max(counts)
+        # Read backwards from the end in chunks until enough line breaks are
+        # seen, so only the tail of a large log is read
+        with open(log_path, 'rb') as f:
+            pos = os.fstat(f.fileno()).st_size
+            data = b""
+            while pos > 0:
+                read_size = min(LOG_TAIL_CHUNK_SIZE, pos)
+                pos -= read_size
+                f.seek(pos)
+                data = f.read(read_size) + data
+                # Line breaks as text mode counts them (\n, \r\n or \r)
+                if data.count(b"\n") + data.count(b"\r") - data.count(b"\r\n") > lines:
+                    break
+        
+        text = data.decode('utf-8', 'replace').replace('\r\n', '\n').replace('\r', '\n')
+        # Each tail starts after the Nth line break before the last line
+        tails = {}
+        start = len(text) - 1 if text.endswith('\n') else len(text)
+        found = 0
+        for n in sorted(counts):
+            while found < n and start >= 0:
+                start = text.rfind('\n', 0, start)
+                found += 1
+            tails[n] = text[start + 1:]
+        return tails
     except Exception as e:
-        return f"Error reading log file: {e}"
+        return dict.fromkeys(counts, f"Error reading log file: {e}")
+
+def get_log_tail(log_path, lines=500):
+    """Get the last N lines from a log file"""
+    return get_log_tails(log_path, (lines,))[lines]
+
+# W&B info fetched within this many seconds is reused, so a monitor restart
+# doesn't rerun get_latest_run.py right after the final notification did
+WANDB_CACHE_TTL = 60
+_wandb_cache = {}  # pid -> (fetched_at, run_url, output)
 
 def get_wandb_metrics_and_url(pid):
     """Get current W&B metrics and run URL for the training process"""
+    cached = _wandb_cache.get(pid)
+    if cached and time.monotonic() - cached[0] < WANDB_CACHE_TTL:
+        return cached[1], cached[2]
+    
     try:
         # Try to get the W&B run ID from the latest run tracking
         cmd = ["python3", "/home/ubuntu/finetune_safe/wandb_tools/get_latest_run.py", "--info-only"]
@@ -261,6 +373,7 @@ def get_wandb_metrics_and_url(pid):
             for line in output.split('\n'):
                 if "Run URL:" in line:
                     run_url = line.split("Run URL:")[-1].strip()
+                    _wandb_cache[pid] = (time.monotonic(), run_url, output)
                     return run_url, output
         
         return None, None
@@ -323,7 +436,6 @@ def send_pushover_with_attachment(title, message, attachment_path=None, priority
             return
         
         # Prepare the request
-        url = "https://api.pushover.net/1/messages.json"
         data = {
             "token": app_token,
             "user": user_key,
@@ -351,10 +463,10 @@ def send_pushover_with_attachment(title, message, attachment_path=None, priority
         
         # Send request
         if files:
-            response = requests.post(url, data=data, files=files, timeout=30)
+            response = _PUSHOVER_SESSION.post(PUSHOVER_URL, data=data, files=files, timeout=30)
             files['attachment'][1].close()  # Close the file handle
         else:
-            response = requests.post(url, data=data, timeout=30)
+            response = _PUSHOVER_SESSION.post(PUSHOVER_URL, data=data, timeout=30)
         
         if response.status_code == 200 and response.json().get('status') == 1:
             # Silent - notification sent successfully
@@ -419,7 +531,7 @@ def monitor_process(arguments):
     wandb_url, metrics_output = get_wandb_metrics_and_url(pid)
     initial_msg = f"<b>Training Started</b><br><br>"
     initial_msg += f"<b>PID:</b> {pid}<br>"
-    initial_msg += f"<b>Hostname:</b> {socket.gethostname()}<br>"
+    initial_msg += f"<b>Hostname:</b> {_HOSTNAME}<br>"
     if log_path:
         initial_msg += f"<b>Log:</b> {log_path}<br>"
     if wandb_url:
@@ -435,71 +547,83 @@ def monitor_process(arguments):
     next_notification_time = start_time + 3600  # 1 hour
     notification_count = 0
     
+    # The kernel wakes us through a pidfd as soon as the process exits; without
+    # pidfd support, fall back to polling process_exists()
+    pidfd = open_pidfd(pid)
+    poller = None
+    if pidfd is not None:
+        poller = select.poll()
+        poller.register(pidfd, select.POLLIN)
+    exited = False
+    
     # Silent monitoring loop
-    while True:
-        elapsed_time = time.time() - start_time
+    try:
+        while True:
+            elapsed_time = time.time() - start_time
         
-        # Check if it's time for periodic notification (every hour)
-        if elapsed_time >= next_notification_time - start_time:
-            notification_count += 1
-            hours_elapsed = int(elapsed_time / 3600)
+            # Check if it's time for periodic notification (every hour)
+            if elapsed_time >= next_notification_time - start_time:
+                notification_count += 1
+                hours_elapsed = int(elapsed_time / 3600)
             
-            # Get W&B metrics
-            wandb_url, metrics_output = get_wandb_metrics_and_url(pid)
+                # Get W&B metrics
+                wandb_url, metrics_output = get_wandb_metrics_and_url(pid)
             
-            # Generate plots (only after 1hr when there's data)
-            plot_files = []
-            if notification_count > 0:
-                plot_files = generate_training_plots()
+                # Generate plots (only after 1hr when there's data)
+                plot_files = []
+                if notification_count > 0:
+                    plot_files = generate_training_plots()
             
-            # Format message
-            msg = f"<b>Training Progress Update</b><br><br>"
-            msg += f"<b>Duration:</b> {hours_elapsed} hour{'s' if hours_elapsed != 1 else ''}<br>"
-            msg += f"<b>PID:</b> {pid}<br>"
-            msg += f"<b>Status:</b> Running <br>"
-            if wandb_url:
-                msg += f'<br><b>W&B:</b> <a href="{wandb_url}">View Metrics</a><br>'
+                # Format message
+                msg = f"<b>Training Progress Update</b><br><br>"
+                msg += f"<b>Duration:</b> {hours_elapsed} hour{'s' if hours_elapsed != 1 else ''}<br>"
+                msg += f"<b>PID:</b> {pid}<br>"
+                msg += f"<b>Status:</b> Running <br>"
+                if wandb_url:
+                    msg += f'<br><b>W&B:</b> <a href="{wandb_url}">View Metrics</a><br>'
             
-            # Add metrics summary if available
-            if metrics_output:
-                # Extract key metrics from output
-                for line in metrics_output.split('\n'):
-                    if 'Step:' in line or 'Loss:' in line or 'Reward:' in line:
-                        msg += f"<b>{line.strip()}</b><br>"
+                # Add metrics summary if available
+                if metrics_output:
+                    # Extract key metrics from output
+                    for line in metrics_output.split('\n'):
+                        if 'Step:' in line or 'Loss:' in line or 'Reward:' in line:
+                            msg += f"<b>{line.strip()}</b><br>"
             
-            # Send with first plot as attachment if available
-            attachment = plot_files[0] if plot_files else None
-            send_pushover_with_attachment(
-                title=f"Training Update - {hours_elapsed}hr",
-                message=msg,
-                attachment_path=attachment,
-                priority=0
-            )
+                # Send with first plot as attachment if available
+                attachment = plot_files[0] if plot_files else None
+                send_pushover_with_attachment(
+                    title=f"Training Update - {hours_elapsed}hr",
+                    message=msg,
+                    attachment_path=attachment,
+                    priority=0
+                )
             
-            # Update next notification time
-            next_notification_time += 3600  # Next hour
+                # Update next notification time
+                next_notification_time += 3600  # Next hour
         
-        # Check if process is still running
-        if not process_exists(pid):
-            # Process finished/crashed!
-            duration = int(time.time() - start_time)
+            # Check if process is still running
+            if exited or not process_exists(pid):
+                # Process finished/crashed!
+                duration = int(time.time() - start_time)
             
-            # Get log tail and send crash report if log path provided
-            log_tail_500 = ""
-            log_tail_2000 = ""
-            if log_path:
-                log_tail_500 = get_log_tail(log_path, 500)
-                log_tail_2000 = get_log_tail(log_path, 2000)
+                # Get log tail and send crash report if log path provided
+                log_tail_500 = ""
+                log_tail_2000 = ""
+                if log_path:
+                    # One read of the log serves both tails
+                    tails = get_log_tails(log_path, (500, 2000))
+                    log_tail_500 = tails[500]
+                    log_tail_2000 = tails[2000]
                 
-                # Send email with 2000 lines
-                send_crash_email(pid, log_path, log_tail_2000)
+                    # Send email with 2000 lines
+                    send_crash_email(pid, log_path, log_tail_2000)
             
-            # Return with clear agent instructions
-            return {
-                "content": [
-                    {
-                        "type": "text",
-                        "text": f"""
+                # Return with clear agent instructions
+                return {
+                    "content": [
+                        {
+                            "type": "text",
+                            "text": f"""
 {'='*80}
 TRAINING PROCESS NO LONGER RUNNING
 {'='*80}
@@ -530,58 +654,66 @@ REQUIRED ACTIONS:
 3. Restart training with /train command
 {'='*80}
 """
-                    }
-                ]
-            }
+                        }
+                    ]
+                }
         
-        if time.time() - start_time >= timeout:
-            # Monitor timeout (NOT process timeout)
-            hours_elapsed = int(timeout / 3600)
+            if time.time() - start_time >= timeout:
+                # Monitor timeout (NOT process timeout)
+                hours_elapsed = int(timeout / 3600)
             
-            # Send final notification before monitor restart
-            wandb_url, metrics_output = get_wandb_metrics_and_url(pid)
+                # Send final notification before monitor restart
+                wandb_url, metrics_output = get_wandb_metrics_and_url(pid)
             
-            # Generate final plots
-            plot_files = generate_training_plots()
+                # Generate final plots
+                plot_files = generate_training_plots()
             
-            msg = f"<b>Monitor Restarting (2hr limit)</b><br><br>"
-            msg += f"<b>Duration:</b> {hours_elapsed} hour{'s' if hours_elapsed != 1 else ''}<br>"
-            msg += f"<b>PID:</b> {pid}<br>"
-            msg += f"<b>Status:</b> Still Running <br>"
-            msg += f"<b>Note:</b> Monitor will restart to avoid system timeout<br>"
-            if wandb_url:
-                msg += f'<br><b>W&B:</b> <a href="{wandb_url}">View Metrics</a><br>'
+                msg = f"<b>Monitor Restarting (2hr limit)</b><br><br>"
+                msg += f"<b>Duration:</b> {hours_elapsed} hour{'s' if hours_elapsed != 1 else ''}<br>"
+                msg += f"<b>PID:</b> {pid}<br>"
+                msg += f"<b>Status:</b> Still Running <br>"
+                msg += f"<b>Note:</b> Monitor will restart to avoid system timeout<br>"
+                if wandb_url:
+                    msg += f'<br><b>W&B:</b> <a href="{wandb_url}">View Metrics</a><br>'
             
-            attachment = plot_files[0] if plot_files else None
-            send_pushover_with_attachment(
-                title=f"Monitor Restarting - {hours_elapsed}hr",
-                message=msg,
-                attachment_path=attachment,
-                priority=0
-            )
+                attachment = plot_files[0] if plot_files else None
+                send_pushover_with_attachment(
+                    title=f"Monitor Restarting - {hours_elapsed}hr",
+                    message=msg,
+                    attachment_path=attachment,
+                    priority=0
+                )
             
-            return {
-                "content": [
-                    {
-                        "type": "text",
-                        "text": json.dumps({
-                            "pid": pid,
-                            "log_path": log_path,
-                            "status": "monitor_timeout",
-                            "duration_seconds": int(timeout),
-                            "process_still_running": process_exists(pid),
-                            "reason": "monitor_reached_time_limit",
-                            "message": SYSTEM_TIMEOUT_WARNING.strip(),
-                            "process_info": process_info
-                        }, indent=2)
-                    }
-                ]
-            }
+                return {
+                    "content": [
+                        {
+                            "type": "text",
+                            "text": json.dumps({
+                                "pid": pid,
+                                "log_path": log_path,
+                                "status": "monitor_timeout",
+                                "duration_seconds": int(timeout),
+                                "process_still_running": process_exists(pid),
+                                "reason": "monitor_reached_time_limit",
+                                "message": SYSTEM_TIMEOUT_WARNING.strip(),
+                                "process_info": process_info
+                            }, indent=2)
+                        }
+                    ]
+                }
         
-        # Continuous monitoring with minimal sleep (0.5 sec default for responsiveness)
-        # Use smaller interval for faster detection
-        actual_interval = min(poll_interval, 0.5)
-        time.sleep(actual_interval)
+            if poller is not None:
+                # Block until the process exits or the next notification/timeout is due
+                deadline = min(next_notification_time, start_time + timeout)
+                exited = bool(poller.poll(math.ceil(max(0, deadline - time.time()) * 1000)))
+            else:
+                # Continuous monitoring with minimal sleep (0.5 sec default for responsiveness)
+                # Use smaller interval for faster detection
+                actual_interval = min(poll_interval, 0.5)
+                time.sleep(actual_interval)
+    finally:
+        if pidfd is not None:
+            os.close(pidfd)
 
 def check_process(arguments):
     """Check if a process is running"""
@@ -606,66 +738,106 @@ def check_process(arguments):
         ]
     }
 
+def format_etime(seconds):
+    """Format elapsed seconds like ps etime: [[dd-]hh:]mm:ss"""
+    days, rem = divmod(int(seconds), 86400)
+    hours, rem = divmod(rem, 3600)
+    minutes, secs = divmod(rem, 60)
+    if days:
+        return f"{days}-{hours:02d}:{minutes:02d}:{secs:02d}"
+    if hours:
+        return f"{hours:02d}:{minutes:02d}:{secs:02d}"
+    return f"{minutes:02d}:{secs:02d}"
+
+def scan_proc_processes(pattern, limit):
+    """List processes straight from /proc, in pid order, stopping at limit matches"""
+    with open("/proc/uptime") as f:
+        uptime = float(f.read().split()[0])
+    clock_ticks = os.sysconf("SC_CLK_TCK")
+    pattern = pattern.lower()
+    
+    processes = []
+    for entry in os.scandir("/proc"):
+        if not entry.name.isdigit():
+            continue
+        try:
+            with open(f"{entry.path}/stat", 'rb') as f:
+                stat_line = f.read()
+            with open(f"{entry.path}/cmdline", 'rb') as f:
+                cmdline = f.read()
+        except OSError:
+            continue  # Exited while scanning, or not readable
+        
+        # comm sits in parentheses and may itself contain spaces or ")"
+        comm_start = stat_line.index(b"(") + 1
+        comm_end = stat_line.rindex(b")")
+        comm = stat_line[comm_start:comm_end].decode('utf-8', 'replace')
+        # Kernel threads have no cmdline; ps shows them as [comm]
+        args = cmdline.replace(b'\x00', b' ').strip().decode('utf-8', 'replace') or f"[{comm}]"
+        
+        if pattern and pattern not in args.lower() and pattern not in comm.lower():
+            continue
+        
+        # starttime is field 22, the 20th after comm; in clock ticks since boot
+        start_ticks = int(stat_line[comm_end + 2:].split()[19])
+        processes.append({
+            "pid": int(entry.name),
+            "elapsed_time": format_etime(max(0.0, uptime - start_ticks / clock_ticks)),
+            "command": comm,
+            "full_command": args
+        })
+        if len(processes) >= limit:
+            break
+    
+    return processes
+
 def find_recent_processes(arguments):
     """Find recent processes that might be candidates for monitoring"""
     pattern = arguments.get("pattern", "")
     limit = arguments.get("limit", 10)
     
-    processes = []
+    processes = None
     
-    try:
-        # Try to find processes using ps command
-        import subprocess
-        result = subprocess.run(['ps', 'ax', '-o', 'pid,etime,comm,args'], 
-                              capture_output=True, text=True, timeout=10)
-        
-        if result.returncode == 0:
-            lines = result.stdout.strip().split('\n')[1:]  # Skip header
-            for line in lines[:limit * 2]:  # Get more than needed to filter
-                parts = line.strip().split(None, 3)
-                if len(parts) >= 4:
-                    try:
-                        pid = int(parts[0])
-                        etime = parts[1]
-                        comm = parts[2]
-                        args = parts[3] if len(parts) > 3 else comm
-                        
-                        # Filter by pattern if provided
-                        if not pattern or pattern.lower() in args.lower() or pattern.lower() in comm.lower():
-                            processes.append({
-                                "pid": pid,
-                                "elapsed_time": etime,
-                                "command": comm,
-                                "full_command": args
-                            })
-                            
-                            if len(processes) >= limit:
-                                break
-                    except ValueError:
-                        continue
-                        
-    except Exception as e:
-        # Fallback: try to read /proc directly
+    # Read /proc directly where it exists (Linux), with no ps fork/exec
+    if os.path.isdir("/proc"):
         try:
-            for pid_dir in sorted(os.listdir("/proc"), key=lambda x: x if x.isdigit() else "0")[:limit]:
-                if pid_dir.isdigit():
-                    try:
-                        pid = int(pid_dir)
-                        proc_path = f"/proc/{pid}"
-                        
-                        with open(f"{proc_path}/cmdline", 'r') as f:
-                            cmdline = f.read().replace('\x00', ' ').strip()
-                        
-                        if not pattern or pattern.lower() in cmdline.lower():
-                            processes.append({
-                                "pid": pid,
-                                "command": cmdline[:50] + "..." if len(cmdline) > 50 else cmdline,
-                                "full_command": cmdline
-                            })
+            processes = scan_proc_processes(pattern, limit)
+        except Exception:
+            pass  # Fall back to ps below
+    
+    if processes is None:
+        processes = []
+        try:
+            # Find processes using ps command
+            result = subprocess.run(['ps', 'ax', '-o', 'pid,etime,comm,args'], 
+                                  capture_output=True, text=True, timeout=10)
+            
+            if result.returncode == 0:
+                lines = result.stdout.strip().split('\n')[1:]  # Skip header
+                for line in lines[:limit * 2]:  # Get more than needed to filter
+                    parts = line.strip().split(None, 3)
+                    if len(parts) >= 4:
+                        try:
+                            pid = int(parts[0])
+                            etime = parts[1]
+                            comm = parts[2]
+                            args = parts[3] if len(parts) > 3 else comm
                             
-                    except:
-                        continue
-        except:
+                            # Filter by pattern if provided
+                            if not pattern or pattern.lower() in args.lower() or pattern.lower() in comm.lower():
+                                processes.append({
+                                    "pid": pid,
+                                    "elapsed_time": etime,
+                                    "command": comm,
+                                    "full_command": args
+                                })
+                                
+                                if len(processes) >= limit:
+                                    break
+                        except ValueError:
+                            continue
+                            
+        except Exception:
             pass
     
     return {